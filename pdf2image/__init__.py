@@ -2,4 +2,10 @@
     __init__ of the pdf2image module
 """
 
-from .pdf2image import convert_from_bytes, convert_from_path
\ No newline at end of file
+from .pdf2image import (
+    convert_from_bytes,
+    convert_from_path,
+    convert_to_archive,
+    convert_to_sink,
+    pdfinfo_from_path
+)
\ No newline at end of file
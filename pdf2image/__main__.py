@@ -0,0 +1,9 @@
+"""
+    Allows running the command line interface with `python -m pdf2image`
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+    Adaptive conversion, the DPI, color mode and format of every page are chosen
+    from its content instead of being the same for the whole document
+"""
+
+import math
+import shutil
+import tempfile
+
+from collections import deque
+
+from .pdf2image import (
+    pdfinfo_from_path,
+    _ProcessGroup,
+    _build_command,
+    _check_rendered,
+    _communicate,
+    _load_from_output_folder,
+    _page_images,
+    _parse_format,
+    _split_pages
+)
+
+from .exceptions import PDFSyntaxError
+from .installation import get_poppler_installation
+
+
+def plan_pages(pdf_path, first_page=None, last_page=None, text_dpi=100, image_dpi=200, max_page_pixels=None,
+               text_fmt='png', image_fmt='jpeg', userpw=None, poppler_path=None):
+    """
+        Description: Choose the rendering settings of every page from its size (pdfinfo) and
+                     its embedded images (pdfimages -list)
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            text_dpi -> DPI of the pages without images, rendered in grayscale
+            image_dpi -> DPI of the pages with images, rendered in color unless all their images are gray
+            max_page_pixels -> Maximum number of pixels of a page, the DPI is lowered to respect it
+            text_fmt -> Output format of the pages without images
+            image_fmt -> Output format of the pages with images
+            userpw -> PDF's password
+            poppler_path -> Path to look for poppler binaries
+        Returns a list of (page_number, dpi, grayscale, fmt) tuples
+    """
+
+    info = pdfinfo_from_path(pdf_path, userpw, poppler_path, last_page)
+
+    first_page = 1 if first_page is None else max(1, first_page)
+
+    if last_page is None or last_page > info['Pages']:
+        last_page = info['Pages']
+
+    if first_page > last_page:
+        return []
+
+    sizes = dict((page_info.page, page_info) for page_info in info['page_info'])
+    images = _page_images(pdf_path, first_page, last_page, userpw, poppler_path)
+
+    plan = []
+    for page in range(first_page, last_page + 1):
+        page_images = images.get(page, [])
+        if page_images:
+            dpi, fmt = image_dpi, image_fmt
+            # The color column, anything else than gray (rgb, cmyk, icc, index...) needs a color render
+            grayscale = all(columns[5] == 'gray' for columns in page_images)
+        else:
+            dpi, grayscale, fmt = text_dpi, True, text_fmt
+
+        if max_page_pixels is not None and page in sizes:
+            # Sizes are in points, 72 per inch
+            square_inches = (sizes[page].width / 72.) * (sizes[page].height / 72.)
+            if square_inches > 0:
+                dpi = max(1, min(dpi, int(math.sqrt(max_page_pixels / square_inches))))
+
+        plan.append((page, dpi, grayscale, fmt))
+
+    return plan
+
+
+def convert_adaptive(pdf_path, first_page=None, last_page=None, text_dpi=100, image_dpi=200, max_page_pixels=None,
+                     text_fmt='png', image_fmt='jpeg', output_folder=None, thread_count=1, userpw=None,
+                     use_cropbox=False, strict=False, poppler_path=None, timeout=None):
+    """
+        Description: Convert PDF to Image using the settings chosen by plan_pages for every page
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            text_dpi -> DPI of the pages without images, rendered in grayscale
+            image_dpi -> DPI of the pages with images, rendered in color unless all their images are gray
+            max_page_pixels -> Maximum number of pixels of a page, the DPI is lowered to respect it
+            text_fmt -> Output format of the pages without images
+            image_fmt -> Output format of the pages with images
+            output_folder -> Write the resulting images to a folder (instead of directly in memory)
+            thread_count -> How many poppler processes run at the same time
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            poppler_path -> Path to look for poppler binaries
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+        Returns the list of images, in page order
+    """
+
+    plan = plan_pages(pdf_path, first_page, last_page, text_dpi, image_dpi, max_page_pixels, text_fmt, image_fmt,
+                      userpw, poppler_path)
+    if not plan:
+        return []
+
+    # Consecutive pages with the same settings are rendered by a single process
+    groups = []
+    for page, dpi, grayscale, fmt in plan:
+        if groups and groups[-1][1] == page - 1 and groups[-1][2:] == (dpi, grayscale, fmt):
+            groups[-1] = (groups[-1][0], page) + groups[-1][2:]
+        else:
+            groups.append((page, page, dpi, grayscale, fmt))
+
+    # Long groups are split so that the threads share the pages, not the groups
+    thread_count = max(1, thread_count)
+    ranges = []
+    for group_first_page, group_last_page, dpi, grayscale, fmt in groups:
+        group_page_count = group_last_page - group_first_page + 1
+        range_count = min(group_page_count, max(1, thread_count * group_page_count // len(plan)))
+        for range_first_page, range_last_page in _split_pages(group_first_page, group_last_page, range_count):
+            ranges.append((range_first_page, range_last_page, dpi, grayscale, fmt))
+
+    # Imported here as uuid is slow to import
+    import uuid
+    output_file = str(uuid.uuid4())
+
+    auto_temp_dir = False
+    if output_folder is None and any(_parse_format(fmt, grayscale)[2] is None for _, _, _, grayscale, fmt in ranges):
+        # TIFF files can only be written to a folder
+        auto_temp_dir = True
+        output_folder = tempfile.mkdtemp()
+
+    installation = get_poppler_installation(poppler_path)
+    # The plan already ran pdfinfo, every range is rendered right away by the processes of a single group
+    process_group = _ProcessGroup(installation.env, timeout)
+    try:
+        images = []
+        processes = deque()
+        for i, (range_first_page, range_last_page, dpi, grayscale, fmt) in enumerate(ranges):
+            if len(processes) == thread_count:
+                images += _collect_range(processes.popleft(), output_folder, auto_temp_dir, strict, process_group,
+                                         images)
+            parsed_fmt, final_extension, parse_buffer_func, use_pdfcairo = _parse_format(fmt, grayscale)
+            range_output_file = '{}_{}'.format(output_file, i)
+            args = _build_command(['-r', str(dpi), pdf_path], output_folder, range_first_page, range_last_page,
+                                  parsed_fmt, range_output_file, userpw, use_cropbox, False, False, grayscale)
+            command = installation.command_path('pdftocairo' if use_pdfcairo else 'pdftoppm')
+            processes.append((range_first_page, range_last_page, range_output_file, final_extension,
+                              parse_buffer_func, process_group.spawn([command] + args)))
+
+        while processes:
+            images += _collect_range(processes.popleft(), output_folder, auto_temp_dir, strict, process_group, images)
+
+        return images
+    finally:
+        process_group.close()
+        if auto_temp_dir:
+            shutil.rmtree(output_folder)
+
+
+def _collect_range(process, output_folder, auto_temp_dir, strict, process_group, images):
+    range_first_page, range_last_page, output_file, final_extension, parse_buffer_func, proc = process
+    data, err = _communicate(proc)
+
+    # Pages rendered by the previous processes are kept in the exception
+    process_group.check(images)
+
+    if b'Syntax Error' in err and strict:
+        raise PDFSyntaxError(err.decode("utf8", "ignore"))
+
+    if output_folder is not None:
+        range_images = _load_from_output_folder(output_folder, output_file, final_extension, in_memory=auto_temp_dir)
+    else:
+        range_images = parse_buffer_func(data)
+    _check_rendered(range_images, range_first_page, range_last_page, proc.returncode, err)
+    return range_images
@@ -0,0 +1,361 @@
+"""
+    Rendering backends, besides the poppler command line tools (pdftoppm and pdftocairo) pages can be
+    rendered in process with the poppler GLib bindings or pypdfium2, or with MuPDF's mutool
+"""
+
+import math
+import os
+import re
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from subprocess import Popen, PIPE
+
+from .exceptions import PDFInfoNotInstalledError, PDFPageCountError, PDFPixelLimitError
+from .installation import get_poppler_installation
+from .metrics import _record_cache, _record_pages, _record_spawn
+
+# The backends that convert_from_path(backend=...) accepts, the first two are run by the converter itself
+BACKENDS = ('pdftoppm', 'pdftocairo', 'poppler-glib', 'pypdfium2', 'mutool')
+
+# Number of documents kept open, every thread rendering a document has its own copy
+DOCUMENT_CACHE_SIZE = 16
+
+
+class _PopplerGLibBackend(object):
+    """
+        In process poppler through PyGObject, documents are not thread safe but
+        distinct documents can be rendered concurrently
+    """
+
+    name = 'poppler-glib'
+
+    def is_available(self):
+        try:
+            _import_poppler_glib()
+            import cairo
+        except (ImportError, ValueError):
+            return False
+        return True
+
+    def open(self, pdf_path, userpw):
+        GLib, Poppler = _import_poppler_glib()
+        try:
+            return Poppler.Document.new_from_file(GLib.filename_to_uri(os.path.abspath(pdf_path), None), userpw)
+        except GLib.Error as ex:
+            raise PDFPageCountError('Unable to open document. %s' % ex.message)
+
+    def page_count(self, document):
+        return document.get_n_pages()
+
+    def page_size(self, document, page):
+        return document.get_page(page - 1).get_size()
+
+    def render(self, document, page, dpi, transparent):
+        import cairo
+        from PIL import Image
+
+        page = document.get_page(page - 1)
+        width, height = _pixel_size(page.get_size(), dpi)
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32 if transparent else cairo.FORMAT_RGB24, width, height)
+        context = cairo.Context(surface)
+        if not transparent:
+            context.set_source_rgb(1, 1, 1)
+            context.paint()
+        context.scale(dpi / 72., dpi / 72.)
+        page.render(context)
+        surface.flush()
+
+        # Cairo stores pixels as native endian 32 bits integers, with premultiplied alpha
+        if sys.byteorder == 'little':
+            raw_mode = 'BGRa' if transparent else 'BGRX'
+        else:
+            raw_mode = 'ARGB' if transparent else 'XRGB'
+        return Image.frombuffer(
+            'RGBA' if transparent else 'RGB',
+            (width, height),
+            bytes(surface.get_data()),
+            'raw',
+            raw_mode,
+            surface.get_stride(),
+            1,
+        )
+
+
+class _PdfiumBackend(object):
+    """
+        In process PDFium through pypdfium2, PDFium is not thread safe at all so
+        every call into it holds the same lock
+    """
+
+    name = 'pypdfium2'
+    lock = threading.Lock()
+
+    def is_available(self):
+        try:
+            import pypdfium2
+        except ImportError:
+            return False
+        return True
+
+    def open(self, pdf_path, userpw):
+        import pypdfium2
+
+        with self.lock:
+            try:
+                return pypdfium2.PdfDocument(pdf_path, password=userpw)
+            except pypdfium2.PdfiumError as ex:
+                raise PDFPageCountError('Unable to open document. %s' % ex)
+
+    def page_count(self, document):
+        with self.lock:
+            return len(document)
+
+    def page_size(self, document, page):
+        with self.lock:
+            return document[page - 1].get_size()
+
+    def render(self, document, page, dpi, transparent):
+        with self.lock:
+            bitmap = document[page - 1].render(
+                scale=dpi / 72.,
+                fill_color=(255, 255, 255, 0 if transparent else 255),
+            )
+            return bitmap.to_pil()
+
+
+class _MutoolBackend(object):
+    """
+        MuPDF's mutool, every page is rendered by its own process writing a PNG to stdout
+    """
+
+    name = 'mutool'
+
+    def is_available(self):
+        try:
+            Popen(['mutool'], stdout=PIPE, stderr=PIPE).communicate()
+        except OSError:
+            return False
+        return True
+
+    def open(self, pdf_path, userpw):
+        # The document is the list of page sizes, mutool has nothing to keep open between pages
+        out, err, returncode = self._run(['pages'], pdf_path, userpw)
+        if returncode != 0:
+            raise PDFPageCountError('Unable to get page count. %s' % err.decode('utf8', 'ignore'))
+
+        sizes = []
+        for page in re.findall(r'<page .*?</page>', out.decode('utf8', 'ignore'), re.DOTALL):
+            box = re.search(r'<CropBox l="([\d.-]+)" b="([\d.-]+)" r="([\d.-]+)" t="([\d.-]+)"', page) or \
+                re.search(r'<MediaBox l="([\d.-]+)" b="([\d.-]+)" r="([\d.-]+)" t="([\d.-]+)"', page)
+            left, bottom, right, top = [float(v) for v in box.groups()]
+            rotation = re.search(r'<Rotate v="(-?\d+)"', page)
+            if rotation is not None and int(rotation.group(1)) % 180 != 0:
+                sizes.append((top - bottom, right - left))
+            else:
+                sizes.append((right - left, top - bottom))
+        return pdf_path, userpw, sizes
+
+    def page_count(self, document):
+        return len(document[2])
+
+    def page_size(self, document, page):
+        return document[2][page - 1]
+
+    def render(self, document, page, dpi, transparent):
+        from PIL import Image
+        from io import BytesIO
+
+        pdf_path, userpw, _ = document
+        args = ['draw', '-q', '-r', str(dpi), '-c', 'rgba' if transparent else 'rgb', '-F', 'png', '-o', '-']
+        out, err, returncode = self._run(args, pdf_path, userpw, [str(page)])
+        if returncode != 0:
+            raise PDFPageCountError('Unable to render page %d. %s' % (page, err.decode('utf8', 'ignore')))
+        return Image.open(BytesIO(out))
+
+    def _run(self, args, pdf_path, userpw, pages=()):
+        if userpw is not None:
+            args = args + ['-p', userpw]
+        try:
+            proc = Popen(['mutool'] + args + [pdf_path] + list(pages), stdout=PIPE, stderr=PIPE)
+            _record_spawn(['mutool'])
+            out, err = proc.communicate()
+        except OSError:
+            raise PDFInfoNotInstalledError('Unable to run mutool. Is MuPDF installed and in PATH?')
+        return out, err, proc.returncode
+
+
+_backends = dict((backend.name, backend) for backend in [_PopplerGLibBackend(), _PdfiumBackend(), _MutoolBackend()])
+
+
+class _DocumentCache(object):
+    """
+        LRU cache of open documents, keyed by backend, path, modification time, size and password.
+        A document is only used by one thread at a time.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.idle = OrderedDict()
+
+    def acquire(self, backend, pdf_path, userpw):
+        key = _document_key(backend, pdf_path, userpw)
+        with self.lock:
+            documents = self.idle.get(key)
+            if documents:
+                self.idle[key] = self.idle.pop(key)
+                _record_cache('document', True)
+                return key, documents.pop()
+        _record_cache('document', False)
+        # Opening is the slow part, done outside of the lock
+        return key, backend.open(pdf_path, userpw)
+
+    def release(self, key, document):
+        with self.lock:
+            self.idle.setdefault(key, []).append(document)
+            self.idle[key] = self.idle.pop(key)
+            while sum(len(documents) for documents in self.idle.values()) > self.max_size:
+                oldest_key = next(iter(self.idle))
+                self.idle[oldest_key].pop(0)
+                if not self.idle[oldest_key]:
+                    del self.idle[oldest_key]
+
+    def discard(self, pdf_path):
+        """
+            Closes the documents opened from pdf_path, e.g. a temporary file that is about to be removed
+        """
+
+        path = os.path.abspath(pdf_path)
+        with self.lock:
+            for key in [key for key in self.idle if key[1] == path]:
+                del self.idle[key]
+
+    def clear(self):
+        with self.lock:
+            self.idle.clear()
+
+
+_document_cache = _DocumentCache(DOCUMENT_CACHE_SIZE)
+
+
+def available_backends(poppler_path=None):
+    """
+        Description: List the backends that can be used on this machine
+        Parameters:
+            poppler_path -> Path to look for poppler binaries
+        Returns a list of backend names, in the order of BACKENDS
+    """
+
+    available = []
+    for name in BACKENDS:
+        if name in _backends:
+            if _backends[name].is_available():
+                available.append(name)
+        elif get_poppler_installation(poppler_path).is_installed(name):
+            available.append(name)
+    return available
+
+
+def clear_document_cache():
+    """
+        Description: Close every document kept open by the in process backends
+    """
+
+    _document_cache.clear()
+
+
+def _convert_in_process(backend_name, pdf_path, dpi, output_folder, first_page, last_page, fmt, thread_count,
+                        userpw, transparent, single_file, output_file, final_extension, grayscale, mono, max_pixels):
+    backend = _backends[backend_name]
+
+    key, document = _document_cache.acquire(backend, pdf_path, userpw)
+    try:
+        page_count = backend.page_count(document)
+
+        first_page = 1 if first_page is None else max(1, first_page)
+
+        if last_page is None or last_page > page_count:
+            last_page = page_count
+
+        if single_file:
+            last_page = first_page
+
+        if first_page > last_page:
+            return []
+
+        pages = list(range(first_page, last_page + 1))
+
+        if max_pixels is not None:
+            total_pixels = 0
+            for page in pages:
+                width, height = _pixel_size(backend.page_size(document, page), dpi)
+                total_pixels += width * height
+            if total_pixels > max_pixels:
+                raise PDFPixelLimitError(
+                    'Rendering pages %d to %d at %s DPI would produce %d pixels, the limit is %d' % (
+                        first_page, last_page, dpi, total_pixels, max_pixels
+                    )
+                )
+    finally:
+        _document_cache.release(key, document)
+
+    def render(page):
+        start_time = time.time()
+        key, document = _document_cache.acquire(backend, pdf_path, userpw)
+        try:
+            image = backend.render(document, page, dpi, transparent)
+        finally:
+            _document_cache.release(key, document)
+        _record_pages(1, None, time.time() - start_time, dpi, fmt)
+
+        if mono:
+            image = image.convert('1')
+        elif grayscale:
+            image = image.convert('LA' if transparent else 'L')
+
+        if output_folder is None:
+            return image
+
+        if single_file:
+            filename = '{}.{}'.format(output_file, final_extension)
+        else:
+            # Same naming as poppler, the page number is padded to the number of digits of the page count
+            filename = '{}-{}.{}'.format(output_file, str(page).zfill(len(str(page_count))), final_extension)
+        # JPEG has no 1 bit mode, pdftoppm writes monochrome JPEG files in grayscale as well
+        (image.convert('L') if image.mode == '1' and fmt == 'jpeg' else image).save(
+            os.path.join(output_folder, filename), format=fmt
+        )
+        return image
+
+    if thread_count <= 1 or len(pages) == 1:
+        return [render(page) for page in pages]
+
+    pool = ThreadPool(min(thread_count, len(pages)))
+    try:
+        return pool.map(render, pages)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _import_poppler_glib():
+    import gi
+    gi.require_version('Poppler', '0.18')
+    from gi.repository import GLib, Poppler
+    return GLib, Poppler
+
+
+def _document_key(backend, pdf_path, userpw):
+    path = os.path.abspath(pdf_path)
+    stat = os.stat(path)
+    return backend.name, path, stat.st_mtime, stat.st_size, userpw
+
+
+def _pixel_size(size, dpi):
+    # Sizes are in points, 72 per inch, and already take the page rotation into account
+    width, height = size
+    return int(math.ceil(width * dpi / 72.)), int(math.ceil(height * dpi / 72.))
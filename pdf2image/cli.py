@@ -0,0 +1,186 @@
+"""
+    pdf2image command line interface, converts many PDFs concurrently into an output directory
+"""
+
+from __future__ import print_function
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from .pdf2image import convert_from_path
+
+DONE_MARKER = '.pdf2image-done'
+
+
+def main(argv=None):
+    """
+        Entry point of the `pdf2image` command, returns the exit code
+    """
+
+    args = _parse_args(argv)
+
+    pdf_paths = _expand_inputs(args.inputs, args.file_list)
+    if not pdf_paths:
+        print('No PDF to convert', file=sys.stderr)
+        return 1
+
+    document_names = _document_names(pdf_paths)
+    for document_name in set(document_names):
+        duplicates = [pdf_path for pdf_path, name in zip(pdf_paths, document_names) if name == document_name]
+        if len(duplicates) > 1:
+            print('{} would be written to the same folder'.format(', '.join(duplicates)), file=sys.stderr)
+            return 1
+
+    # The job budget is shared between the documents converted at the same time
+    threads_per_document = max(1, min(args.threads, args.jobs))
+    document_count = max(1, args.jobs // threads_per_document)
+
+    start_time = time.time()
+    total_pages = 0
+    failures = 0
+
+    pool = ThreadPool(min(document_count, len(pdf_paths)))
+    try:
+        tasks = [
+            (pdf_path, document_name, args, threads_per_document)
+            for pdf_path, document_name in zip(pdf_paths, document_names)
+        ]
+        for pdf_path, page_count, elapsed, error in pool.imap_unordered(_convert_document, tasks):
+            if error is not None:
+                failures += 1
+                print('{}: failed ({})'.format(pdf_path, error), file=sys.stderr)
+            elif page_count is None:
+                print('{}: skipped, already converted'.format(pdf_path))
+            else:
+                total_pages += page_count
+                print('{}: {} pages in {:.2f} sec ({:.2f} pages/sec)'.format(
+                    pdf_path, page_count, elapsed, page_count / elapsed if elapsed > 0 else 0.
+                ))
+    finally:
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start_time
+    print('{} documents, {} pages in {:.2f} sec ({:.2f} pages/sec), {} failed'.format(
+        len(pdf_paths), total_pages, elapsed, total_pages / elapsed if elapsed > 0 else 0., failures
+    ))
+
+    return 1 if failures else 0
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog='pdf2image', description='Convert PDF documents to images using poppler.')
+    parser.add_argument('inputs', nargs='*', help='PDF files or glob patterns')
+    parser.add_argument('--file-list', help='File containing one PDF path per line, - for stdin')
+    parser.add_argument('-o', '--output-dir', default='.', help='Directory in which one folder per document is created')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='Maximum number of poppler processes running at the same time')
+    parser.add_argument('-t', '--threads', type=int, default=1, help='Poppler processes used for a single document')
+    parser.add_argument('--dpi', type=int, default=200, help='Image quality in DPI')
+    parser.add_argument('--fmt', default='ppm', help='Output image format')
+    parser.add_argument('-f', '--first-page', type=int, help='First page to process')
+    parser.add_argument('-l', '--last-page', type=int, help='Last page to process before stopping')
+    parser.add_argument('--userpw', help="PDF's password")
+    parser.add_argument('--ownerpw', help="PDF's owner password")
+    parser.add_argument('--decrypt', action='store_true', help='Decrypt each document once with qpdf before rendering')
+    parser.add_argument('--cropbox', action='store_true', help='Use cropbox instead of mediabox')
+    parser.add_argument('--grayscale', action='store_true', help='Output grayscale images')
+    parser.add_argument('--mono', action='store_true', help='Output monochrome images')
+    parser.add_argument('--transparent', action='store_true', help='Output with a transparent background')
+    parser.add_argument('--single-file', action='store_true', help='Only convert the first page')
+    parser.add_argument('--strict', action='store_true', help='Fail on syntax errors')
+    parser.add_argument('--poppler-path', help='Path to look for poppler binaries')
+    parser.add_argument('--timeout', type=float, help='Seconds after which the conversion of a document is aborted')
+    parser.add_argument('--force', action='store_true', help='Convert documents that were already converted')
+    return parser.parse_args(argv)
+
+
+def _expand_inputs(inputs, file_list=None):
+    patterns = list(inputs)
+    if file_list is not None:
+        if file_list == '-':
+            patterns.extend(line.strip() for line in sys.stdin)
+        else:
+            with open(file_list) as f:
+                patterns.extend(line.strip() for line in f)
+
+    pdf_paths = []
+    # The same file can be given several times under different paths, it is only converted once
+    seen = set()
+    for pattern in patterns:
+        if not pattern:
+            continue
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for pdf_path in matches:
+            real_path = os.path.realpath(pdf_path)
+            if real_path not in seen:
+                seen.add(real_path)
+                pdf_paths.append(pdf_path)
+    return pdf_paths
+
+
+def _document_names(pdf_paths):
+    # The output folder of a document is named after its file, documents with the same file name
+    # in different directories keep the directories below the one they have in common
+    stems = [os.path.splitext(os.path.basename(pdf_path))[0] for pdf_path in pdf_paths]
+    names = list(stems)
+    for stem in set(stems):
+        indexes = [i for i, other_stem in enumerate(stems) if other_stem == stem]
+        if len(indexes) == 1:
+            continue
+        directories = [os.path.abspath(os.path.dirname(pdf_paths[i])).split(os.sep) for i in indexes]
+        common = 0
+        while all(len(directory) > common and directory[common] == directories[0][common]
+                  for directory in directories):
+            common += 1
+        for i, directory in zip(indexes, directories):
+            names[i] = os.path.join(*(directory[common:] + [stem]))
+    return names
+
+
+def _convert_document(task):
+    pdf_path, document_name, args, thread_count = task
+    output_folder = os.path.join(args.output_dir, document_name)
+    marker = os.path.join(output_folder, DONE_MARKER)
+
+    if not args.force and os.path.exists(marker):
+        return pdf_path, None, 0., None
+
+    start_time = time.time()
+    try:
+        if not os.path.isdir(output_folder):
+            os.makedirs(output_folder)
+        images = convert_from_path(
+            pdf_path,
+            dpi=args.dpi,
+            output_folder=output_folder,
+            first_page=args.first_page,
+            last_page=args.last_page,
+            fmt=args.fmt,
+            thread_count=thread_count,
+            userpw=args.userpw,
+            ownerpw=args.ownerpw,
+            decrypt=args.decrypt,
+            use_cropbox=args.cropbox,
+            strict=args.strict,
+            transparent=args.transparent,
+            single_file=args.single_file,
+            output_file=os.path.basename(document_name),
+            poppler_path=args.poppler_path,
+            grayscale=args.grayscale,
+            mono=args.mono,
+            timeout=args.timeout,
+        )
+        [im.close() for im in images]
+        # The marker is only written once every page is on disk, interrupted conversions are redone
+        open(marker, 'w').close()
+    except Exception as ex:
+        return pdf_path, None, 0., ex
+
+    return pdf_path, len(images), time.time() - start_time, None
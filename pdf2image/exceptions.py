@@ -13,3 +13,23 @@ class PDFPageCountError(Exception):
 class PDFSyntaxError(Exception):
     "Syntax error was thrown during rendering"
     pass
+
+class PDFPopplerTimeoutError(Exception):
+    "Happens when poppler did not finish before the timeout, images holds the pages rendered until then"
+    def __init__(self, message, images=None):
+        super(PDFPopplerTimeoutError, self).__init__(message)
+        self.images = images if images is not None else []
+
+class PDFPopplerResourceError(Exception):
+    "Happens when poppler was killed for exceeding its resource limits, images holds the pages rendered until then"
+    def __init__(self, message, images=None):
+        super(PDFPopplerResourceError, self).__init__(message)
+        self.images = images if images is not None else []
+
+class PDFPixelLimitError(Exception):
+    "Happens when the pages to render have more pixels than allowed"
+    pass
+
+class PDFRenderError(Exception):
+    "Happens when poppler did not output a page, it crashed or was unable to render it"
+    pass
@@ -0,0 +1,168 @@
+"""
+    Incremental conversion, only the pages whose content changed since the last
+    conversion are rendered again, the others are reused from a cache folder
+"""
+
+import hashlib
+import os
+
+from .pdf2image import convert_to_sink, _ProcessGroup, _parse_format, _parse_image_list, _pdfinfo
+from .parsers import ppm_file_size
+
+from .exceptions import PDFInfoNotInstalledError, PDFPageCountError
+from .installation import get_poppler_installation
+from .metrics import _record_cache
+
+# Resolution of the grayscale render that is part of the fingerprint, low enough to be cheap
+FINGERPRINT_DPI = 10
+
+
+def page_fingerprints(pdf_path, first_page=None, last_page=None, userpw=None, poppler_path=None):
+    """
+        Description: Compute a fingerprint of every page from its text (pdftotext), the properties of its
+                     embedded images (pdfimages -list), its boxes and rotation (pdfinfo) and a grayscale
+                     render at FINGERPRINT_DPI (pdftoppm)
+        Parameters:
+            pdf_path -> Path to the PDF that you want to fingerprint
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            userpw -> PDF's password
+            poppler_path -> Path to look for poppler binaries
+        Returns a list of (page_number, fingerprint) tuples
+    """
+
+    page_args = []
+    if first_page is not None:
+        page_args.extend(['-f', str(first_page)])
+    if last_page is not None:
+        page_args.extend(['-l', str(last_page)])
+    if userpw is not None:
+        page_args.extend(['-upw', userpw])
+
+    installation = get_poppler_installation(poppler_path)
+
+    # The low resolution render catches what the text and the image list miss: vector graphics, annotations,
+    # form fields and images replaced by others of the same size
+    render_args = ['-r', str(FINGERPRINT_DPI)]
+    if installation.supports('pdftoppm', '-gray'):
+        render_args.append('-gray')
+
+    process_group = _ProcessGroup(installation.env)
+    try:
+        # Every tool runs at the same time
+        text_proc = process_group.spawn(
+            [installation.command_path('pdftotext')] + page_args + ['-layout', pdf_path, '-']
+        )
+        images_proc = process_group.spawn([installation.command_path('pdfimages')] + page_args + ['-list', pdf_path])
+        render_proc = process_group.spawn(
+            [installation.command_path('pdftoppm')] + page_args + render_args + [pdf_path]
+        )
+        info = _pdfinfo(pdf_path, userpw, poppler_path, process_group, last_page=last_page)
+        text, text_err = text_proc.communicate()
+        images, _ = images_proc.communicate()
+        render, render_err = render_proc.communicate()
+    except OSError:
+        raise PDFInfoNotInstalledError('Unable to fingerprint pages. Is poppler installed and in PATH?')
+    finally:
+        process_group.close()
+
+    if text_proc.returncode != 0:
+        raise PDFPageCountError('Unable to fingerprint pages. %s' % text_err.decode("utf8", "ignore"))
+
+    # Every page ends with a form feed
+    page_texts = text.split(b'\f')[:-1]
+
+    page_images = _parse_image_list(images.decode("utf8", "ignore"))
+
+    page_infos = dict((page_info.page, page_info) for page_info in info['page_info'])
+
+    page_renders = []
+    index = 0
+    while index < len(render):
+        file_size = ppm_file_size(render, index)
+        if file_size is None or index + file_size > len(render):
+            break
+        page_renders.append(render[index:index + file_size])
+        index += file_size
+    if len(page_renders) != len(page_texts):
+        # Without the render a changed page could be taken for an unchanged one
+        raise PDFPageCountError('Unable to fingerprint pages. %s' % render_err.decode("utf8", "ignore"))
+
+    fingerprints = []
+    for i, page_text in enumerate(page_texts):
+        page = (first_page or 1) + i
+        fingerprint = hashlib.sha1(page_text)
+        for columns in page_images.get(page, []):
+            # The image and object numbers are skipped as they change whenever other pages change
+            fingerprint.update(('\n' + ' '.join(columns[2:10] + columns[12:])).encode('utf8'))
+        fingerprint.update(('\n' + repr(tuple(page_infos.get(page, ())))).encode('utf8'))
+        fingerprint.update(page_renders[i])
+        fingerprints.append((page, fingerprint.hexdigest()))
+
+    return fingerprints
+
+
+def convert_incremental(pdf_path, cache_folder, dpi=200, first_page=None, last_page=None, fmt='ppm',
+                        thread_count=1, userpw=None, use_cropbox=False, strict=False, transparent=False,
+                        poppler_path=None, grayscale=False, timeout=None):
+    """
+        Description: Convert PDF to Image, only rendering the pages whose fingerprint is not in the cache folder
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            cache_folder -> Folder in which the rendered pages are kept between conversions
+            dpi -> Image quality in DPI (default 200)
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            fmt -> Output image format
+            thread_count -> How many threads we are allowed to spawn for processing
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            transparent -> Output with a transparent background instead of a white one.
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which the rendering of each changed page range is aborted
+        Returns the list of images, opened from the cache folder
+    """
+
+    from PIL import Image
+
+    _, final_extension, _, _ = _parse_format(fmt, grayscale)
+
+    # The rendering options are part of the key, the same page rendered differently is another entry
+    options = repr((dpi, final_extension, use_cropbox, transparent, grayscale)).encode('utf8')
+
+    cache_paths = {}
+    missing_pages = []
+    for page, fingerprint in page_fingerprints(pdf_path, first_page, last_page, userpw, poppler_path):
+        key = hashlib.sha1(options + fingerprint.encode('utf8')).hexdigest()
+        cache_paths[page] = os.path.join(cache_folder, key + '.' + final_extension)
+        cached = os.path.exists(cache_paths[page])
+        _record_cache('page', cached)
+        if not cached:
+            missing_pages.append(page)
+
+    def write_page(page, data):
+        # Written under a temporary name first so that a partial file is never reused
+        temp_path = cache_paths[page] + '.' + str(os.getpid()) + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.rename(temp_path, cache_paths[page])
+
+    # Contiguous changed pages are rendered with a single call
+    for range_first_page, range_last_page in _contiguous_ranges(missing_pages):
+        convert_to_sink(pdf_path, write_page, dpi=dpi, first_page=range_first_page, last_page=range_last_page,
+                        fmt=fmt, thread_count=thread_count, userpw=userpw, use_cropbox=use_cropbox, strict=strict,
+                        transparent=transparent, poppler_path=poppler_path, grayscale=grayscale, timeout=timeout)
+
+    return [Image.open(cache_paths[page]) for page in sorted(cache_paths)]
+
+
+def _contiguous_ranges(pages):
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page - 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return [tuple(r) for r in ranges]
@@ -0,0 +1,91 @@
+"""
+    Detection of the poppler installation, done once per poppler_path and shared by every conversion
+"""
+
+import os
+import re
+import threading
+
+from subprocess import Popen, PIPE
+
+
+class PopplerInstallation(object):
+    """
+        Description: The poppler binaries of poppler_path (PATH when None), the environment to run them,
+                     their version and the options they support, everything is detected at most once
+        Parameters:
+            poppler_path -> Path to look for poppler binaries
+    """
+
+    def __init__(self, poppler_path=None):
+        self.poppler_path = poppler_path
+
+        # Add poppler path to LD_LIBRARY_PATH
+        self.env = os.environ.copy()
+        if poppler_path is not None:
+            self.env["LD_LIBRARY_PATH"] = poppler_path + ":" + self.env.get("LD_LIBRARY_PATH", "")
+
+        self._lock = threading.Lock()
+        self._command_paths = {}
+        self._help = {}
+        self._version = None
+
+    def command_path(self, command):
+        if command not in self._command_paths:
+            path = command + '.exe' if os.name == 'nt' else command
+            if self.poppler_path is not None:
+                path = os.path.join(self.poppler_path, path)
+            self._command_paths[command] = path
+        return self._command_paths[command]
+
+    def is_installed(self, command):
+        return self._help_output(command) is not None
+
+    def supports(self, command, option):
+        """
+            Returns True if `command -h` lists option, e.g. supports('pdftoppm', '-progress')
+        """
+
+        help_output = self._help_output(command)
+        return help_output is not None and re.search(r'^\s*' + re.escape(option) + r'\b', help_output, re.M) is not None
+
+    @property
+    def version(self):
+        """
+            Version of pdftoppm as a tuple of integers, None when it can not be run
+        """
+
+        if self._version is None:
+            help_output = self._help_output('pdftoppm')
+            match = re.search(r'version (\d+(?:\.\d+)*)', help_output or '')
+            self._version = tuple(int(v) for v in match.group(1).split('.')) if match else ()
+        return self._version or None
+
+    def _help_output(self, command):
+        with self._lock:
+            if command not in self._help:
+                try:
+                    # The help and the version are printed on stderr, older versions exit with 1 or 99
+                    out, err = Popen([self.command_path(command), '-h'], env=self.env, stdout=PIPE,
+                                     stderr=PIPE).communicate()
+                    self._help[command] = (out + err).decode("utf8", "ignore")
+                except OSError:
+                    self._help[command] = None
+            return self._help[command]
+
+
+_installations = {}
+_installations_lock = threading.Lock()
+
+
+def get_poppler_installation(poppler_path=None):
+    """
+        Description: Get the PopplerInstallation of poppler_path, created on the first call and then reused
+        Parameters:
+            poppler_path -> Path to look for poppler binaries
+    """
+
+    with _installations_lock:
+        if poppler_path not in _installations:
+            _installations[poppler_path] = PopplerInstallation(poppler_path)
+        return _installations[poppler_path]
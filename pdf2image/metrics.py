@@ -0,0 +1,189 @@
+"""
+    Conversion metrics, counters and histograms recorded in a pluggable registry.
+
+    Nothing is recorded until a registry is installed with set_registry(Registry()), any object with
+    the same inc and observe methods can be used to forward the metrics to another system.
+"""
+
+import os
+import threading
+
+# Name -> (type, help) of every metric recorded by pdf2image
+METRICS = {
+    'pdf2image_conversions_total': ('counter', 'Conversions done by convert_from_path and convert_from_bytes'),
+    'pdf2image_pages_rendered_total': ('counter', 'Pages rendered'),
+    'pdf2image_bytes_produced_total': ('counter', 'Bytes of encoded images produced'),
+    'pdf2image_process_spawns_total': ('counter', 'Poppler processes spawned'),
+    'pdf2image_pdfinfo_calls_total': ('counter', 'pdfinfo calls'),
+    'pdf2image_cache_hits_total': ('counter', 'Cache hits'),
+    'pdf2image_cache_misses_total': ('counter', 'Cache misses'),
+    'pdf2image_conversion_seconds': ('histogram', 'Duration of a conversion'),
+    'pdf2image_page_render_seconds': ('histogram', 'Rendering time of a page'),
+}
+
+# Same default buckets as the Prometheus clients
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 7.5, 10.0, float('inf'))
+
+
+class NullRegistry(object):
+    """
+        Default registry, drops everything
+    """
+
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+
+class Registry(object):
+    """
+        Description: In memory registry of counters and histograms, thread safe
+        Parameters:
+            buckets -> Upper bounds of the histogram buckets, in seconds
+    """
+
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != float('inf'):
+            self.buckets += (float('inf'),)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = [[0] * len(self.buckets), 0., 0]
+            bucket_counts, _, _ = histogram = self._histograms[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def value(self, name, **labels):
+        """
+            Returns the value of a counter, or the number of observations of a histogram
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key in self._histograms:
+                return self._histograms[key][2]
+            return self._counters.get(key, 0)
+
+    def expose(self):
+        """
+            Returns the metrics in the Prometheus text exposition format
+        """
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name, default_type):
+            if name not in described:
+                described.add(name)
+                metric_type, help_text = METRICS.get(name, (default_type, None))
+                if help_text is not None:
+                    lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s %s' % (name, metric_type))
+
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append('%s%s %s' % (name, _format_labels(labels), _format_value(value)))
+
+        for (name, labels), (bucket_counts, total, count) in histograms:
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append('%s_bucket%s %d' % (name, _format_labels(labels + (('le', le),)), cumulative))
+            lines.append('%s_sum%s %s' % (name, _format_labels(labels), _format_value(total)))
+            lines.append('%s_count%s %d' % (name, _format_labels(labels), count))
+
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+_registry = NullRegistry()
+
+
+def get_registry():
+    """
+        Description: Get the registry the metrics are recorded in
+    """
+
+    return _registry
+
+
+def set_registry(registry=None):
+    """
+        Description: Record the metrics in registry, None goes back to the NullRegistry
+        Parameters:
+            registry -> Object with inc(name, value=1, **labels) and observe(name, value, **labels) methods
+        Returns the previous registry
+    """
+
+    global _registry
+    previous = _registry
+    _registry = registry if registry is not None else NullRegistry()
+    return previous
+
+
+def expose(registry=None):
+    """
+        Description: Prometheus text exposition of registry (the current one when None)
+    """
+
+    return (registry if registry is not None else _registry).expose()
+
+
+def _record_spawn(args):
+    _registry.inc('pdf2image_process_spawns_total', command=os.path.basename(args[0]))
+
+
+def _record_pages(page_count, byte_count, seconds, dpi, fmt):
+    # seconds is the time taken by the page_count pages, shared equally between them
+    registry = _registry
+    if not registry.enabled or page_count == 0:
+        return
+    dpi, fmt = str(dpi), str(fmt)
+    registry.inc('pdf2image_pages_rendered_total', page_count, dpi=dpi, fmt=fmt)
+    if byte_count is not None:
+        registry.inc('pdf2image_bytes_produced_total', byte_count, dpi=dpi, fmt=fmt)
+    for _ in range(page_count):
+        registry.observe('pdf2image_page_render_seconds', seconds / page_count, dpi=dpi, fmt=fmt)
+
+
+def _record_cache(cache, hit):
+    _registry.inc('pdf2image_cache_hits_total' if hit else 'pdf2image_cache_misses_total', cache=cache)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,131 @@
+"""
+    Compact conversion results, every page keeps its encoded bytes along with its page number,
+    DPI and source, and is only decoded when its image is needed
+"""
+
+from io import BytesIO
+
+from .pdf2image import convert_to_sink, _parse_format
+
+
+class Page(object):
+    """
+        Description: A rendered page, its image is decoded by to_image() and close() releases its buffers
+        Parameters:
+            page -> Page number in the source document
+            data -> Encoded image, bytes or any buffer
+            dpi -> DPI at which the page was rendered
+            source -> Path of the source document
+            fmt -> Format of data
+    """
+
+    __slots__ = ('page', 'data', 'dpi', 'source', 'fmt', 'size', 'mode', '_image')
+
+    def __init__(self, page, data, dpi=None, source=None, fmt=None):
+        # Pillow is only imported when images are actually needed
+        from PIL import Image
+
+        self.page = page
+        self.data = data
+        self.dpi = dpi
+        self.source = source
+        self.fmt = fmt
+        # Only the header is read here, the pixels are decoded on the first access to the image
+        self._image = Image.open(BytesIO(data))
+        self.size = self._image.size
+        self.mode = self._image.mode
+
+    def to_image(self):
+        if self._image is None:
+            raise ValueError('Page %d is closed' % self.page)
+        return self._image
+
+    def close(self):
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+        self.data = None
+
+    def __repr__(self):
+        return '<Page %d %s %dx%d %s>' % (self.page, self.mode, self.size[0], self.size[1], self.fmt)
+
+
+class PageList(object):
+    """
+        Description: The pages of a conversion, in page order, close() (or leaving a with block)
+                     releases the buffers of every page at once
+    """
+
+    __slots__ = ('pages',)
+
+    def __init__(self, pages=None):
+        self.pages = list(pages) if pages is not None else []
+
+    def append(self, page):
+        self.pages.append(page)
+
+    def images(self):
+        return [page.to_image() for page in self.pages]
+
+    def close(self):
+        for page in self.pages:
+            page.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc, value, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    def __getitem__(self, index):
+        return self.pages[index]
+
+
+def convert_to_pages(pdf_path, dpi=200, first_page=None, last_page=None, fmt='ppm', thread_count=1, userpw=None,
+                     use_cropbox=False, strict=False, transparent=False, poppler_path=None, grayscale=False,
+                     timeout=None, max_memory=None, max_cpu_time=None, mono=False):
+    """
+        Description: Convert PDF to a PageList, the pages are kept encoded until their images are needed
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            dpi -> Image quality in DPI (default 200)
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            fmt -> Output image format
+            thread_count -> How many threads we are allowed to spawn for processing
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            transparent -> Output with a transparent background instead of a white one.
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+            max_memory -> Address space limit of each poppler process in bytes (POSIX only)
+            max_cpu_time -> CPU time limit of each poppler process in seconds (POSIX only)
+            mono -> Output monochrome image(s), 1 bit per pixel
+        Returns a PageList, to be closed (or used in a with block) once the pages are no longer needed
+    """
+
+    parsed_fmt, _, _, _ = _parse_format(fmt, grayscale, mono)
+
+    pages = PageList()
+
+    def add_page(page, data):
+        pages.append(Page(page, data, dpi, pdf_path, parsed_fmt))
+
+    try:
+        convert_to_sink(pdf_path, add_page, dpi=dpi, first_page=first_page, last_page=last_page, fmt=fmt,
+                        thread_count=thread_count, userpw=userpw, use_cropbox=use_cropbox, strict=strict,
+                        transparent=transparent, poppler_path=poppler_path, grayscale=grayscale, timeout=timeout,
+                        max_memory=max_memory, max_cpu_time=max_cpu_time, mono=mono)
+    except:
+        pages.close()
+        raise
+
+    return pages
@@ -2,33 +2,56 @@
     pdf2image custom buffer parsers
 """
 
-from io import BytesIO
+import struct
 
-from PIL import Image
+from io import BytesIO
 
 def parse_buffer_to_ppm(data):
     """
-        Parse PPM file bytes to Pillow Image
+        Parse PPM (or PGM/PBM for grayscale/monochrome outputs) file bytes to Pillow Image
     """
 
+    # Pillow is only imported when images are actually needed
+    from PIL import Image
+
     images = []
 
     index = 0
 
     while index < len(data):
-        code, size, rgb = tuple(data[index:index + 40].split(b'\n')[0:3])
-        size_x, size_y = tuple(size.split(b' '))
-        file_size = len(code) + len(size) + len(rgb) + 3 + int(size_x) * int(size_y) * 3
+        file_size = ppm_file_size(data, index)
+        if file_size is None or index + file_size > len(data):
+            # Truncated stream, the process writing it died before the end of the page
+            return images
         images.append(Image.open(BytesIO(data[index:index + file_size])))
         index += file_size
 
     return images
 
+def ppm_file_size(data, index=0):
+    """
+        Size of the PPM (or PGM/PBM) file starting at index in data, None if its header is incomplete
+    """
+
+    header = data[index:index + 40].split(b'\n')
+    code = header[0]
+    if len(header) < (3 if code == b'P4' else 4):
+        return None
+    size = header[1]
+    size_x, size_y = tuple(size.split(b' '))
+    if code == b'P4':
+        # PBM has no maxval line and its rows are packed, 8 pixels per byte
+        return len(code) + len(size) + 2 + (int(size_x) + 7) // 8 * int(size_y)
+    # 3 bytes per pixel for PPM (P6), 1 for PGM (P5)
+    return len(code) + len(size) + len(header[2]) + 3 + int(size_x) * int(size_y) * (3 if code == b'P6' else 1)
+
 def parse_buffer_to_jpeg(data):
     """
         Parse JPEG file bytes to Pillow Image
     """
 
+    from PIL import Image
+
     return [
         Image.open(BytesIO(image_data + b'\xff\xd9'))
         for image_data in data.split(b'\xff\xd9')[:-1] # Last element is obviously empty
@@ -39,17 +62,66 @@ def parse_buffer_to_png(data):
         Parse PNG file bytes to Pillow Image
     """
 
+    from PIL import Image
+
     images = []
 
-    c1 = 0
-    c2 = 0
-    data_len = len(data)
-    while c1 < data_len:
-        # IEND can appear in a PNG without being the actual end
-        if data[c2:c2 + 4] == b'IEND' and (c2 + 8 == data_len or data[c2+9:c2+12] == b'PNG'):
-            images.append(Image.open(BytesIO(data[c1:c2 + 8])))
-            c1 = c2 + 8
-            c2 = c1
-        c2 += 1
+    index = 0
+    while index < len(data):
+        file_size = png_file_size(data, index)
+        if file_size is None:
+            # Truncated stream, nothing more to extract
+            return images
+        images.append(Image.open(BytesIO(data[index:index + file_size])))
+        index += file_size
 
     return images
+
+def png_file_size(data, index=0):
+    """
+        Size of the PNG file starting at index in data, None if it is incomplete
+    """
+
+    # Skip the 8 bytes signature and walk the chunks (length, type, data, crc) until IEND
+    chunk_index = index + 8
+    chunk_type = None
+    while chunk_type != b'IEND':
+        if chunk_index + 8 > len(data):
+            return None
+        chunk_length = struct.unpack('>I', data[chunk_index:chunk_index + 4])[0]
+        chunk_type = data[chunk_index + 4:chunk_index + 8]
+        chunk_index += chunk_length + 12
+    if chunk_index > len(data):
+        return None
+    return chunk_index - index
+
+def jpeg_file_size(data, index=0):
+    """
+        Size of the JPEG file starting at index in data, None if it is incomplete
+    """
+
+    # Skip the SOI marker and walk the segments (marker, length, data) until EOI,
+    # the entropy coded data after a SOS segment ends at the first marker that is not RSTn or a stuffed 0xFF
+    position = index + 2
+    while True:
+        if position + 2 > len(data):
+            return None
+        marker = struct.unpack('>B', data[position + 1:position + 2])[0]
+        if marker == 0xff:
+            # Fill byte
+            position += 1
+            continue
+        if marker == 0xd9:
+            return position + 2 - index
+        if position + 4 > len(data):
+            return None
+        position += 2 + struct.unpack('>H', data[position + 2:position + 4])[0]
+        if marker == 0xda:
+            while True:
+                position = data.find(b'\xff', position)
+                if position == -1 or position + 2 > len(data):
+                    return None
+                next_byte = struct.unpack('>B', data[position + 1:position + 2])[0]
+                if next_byte != 0 and not 0xd0 <= next_byte <= 0xd7:
+                    break
+                position += 2
@@ -0,0 +1,197 @@
+"""
+    Failure tolerant conversion, the pages that could be rendered are returned along with
+    the error of every other page, and only the failed pages are rendered again
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from collections import deque, namedtuple
+
+from PIL import Image
+
+from .pdf2image import (
+    TRANSPARENT_FILE_TYPES,
+    _ProcessGroup,
+    _build_command,
+    _communicate,
+    _page_range,
+    _parse_format,
+    _render_single_pages,
+    _split_pages
+)
+
+from .exceptions import PDFPopplerTimeoutError, PDFRenderError, PDFSyntaxError
+from .installation import get_poppler_installation
+from .metrics import _record_pages
+
+# Outcome of a page, image is None and error is set when it could not be rendered
+PageResult = namedtuple('PageResult', ['page', 'image', 'error', 'attempts'])
+
+
+def convert_partial(pdf_path, dpi=200, first_page=None, last_page=None, fmt='ppm', thread_count=1, userpw=None,
+                    use_cropbox=False, strict=False, transparent=False, poppler_path=None, grayscale=False,
+                    timeout=None, retries=1):
+    """
+        Description: Convert PDF to Image without failing as a whole when some pages can not be rendered
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            dpi -> Image quality in DPI (default 200)
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            fmt -> Output image format
+            thread_count -> How many threads we are allowed to spawn for processing
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> A page whose rendering printed a Syntax Error fails with PDFSyntaxError
+            transparent -> Output with a transparent background instead of a white one.
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which the conversion stops, the pages not rendered by then fail
+                       with PDFPopplerTimeoutError
+            retries -> How many more times a page that was not output is rendered again, on its own
+        Returns the list of the PageResult of every page, in page order
+    """
+
+    parsed_fmt, _, parse_buffer_func, use_pdfcairo_format = _parse_format(fmt, grayscale)
+    use_pdfcairo = use_pdfcairo_format or (transparent and parsed_fmt in TRANSPARENT_FILE_TYPES)
+
+    installation = get_poppler_installation(poppler_path)
+    process_group = _ProcessGroup(installation.env, timeout)
+    # TIFF files can not be written to a pipe, the pages are rendered to a temporary folder
+    output_folder = tempfile.mkdtemp() if parse_buffer_func is None else None
+    try:
+        first_page, last_page, _ = _page_range(pdf_path, first_page, last_page, userpw, poppler_path,
+                                               process_group)
+        if first_page > last_page:
+            return []
+        pages = list(range(first_page, last_page + 1))
+
+        images = {}
+        errors = {}
+        # Pages whose failure is deterministic and that are not rendered again
+        final_pages = set()
+        attempts = dict((page, 0) for page in pages)
+
+        try:
+            if not use_pdfcairo:
+                _render_ranges(pdf_path, first_page, last_page, dpi, parsed_fmt, parse_buffer_func, thread_count,
+                               userpw, use_cropbox, strict, transparent, grayscale, installation, process_group,
+                               images, errors, attempts)
+
+            # pdftocairo only writes a page at a time to stdout, every page has its own process from the start
+            for _ in range(retries + 1 if use_pdfcairo else retries):
+                failed_pages = [page for page in pages if page not in images and page not in final_pages]
+                if not failed_pages:
+                    break
+                if output_folder is None:
+                    rendered_pages = (
+                        (page, parse_buffer_func(data), None, err)
+                        for page, data, err in _render_single_pages(pdf_path, failed_pages, dpi, parsed_fmt, userpw,
+                                                                    use_cropbox, transparent, grayscale, use_pdfcairo,
+                                                                    max(1, thread_count), poppler_path, process_group)
+                    )
+                else:
+                    rendered_pages = _render_single_pages_to_folder(pdf_path, failed_pages, dpi, parsed_fmt, userpw,
+                                                                    use_cropbox, transparent, grayscale,
+                                                                    max(1, thread_count), installation,
+                                                                    process_group, output_folder)
+                for page, page_images, returncode, err in rendered_pages:
+                    attempts[page] += 1
+                    if b'Syntax Error' in err and strict:
+                        # Rendering the page again would print the same error
+                        errors[page] = PDFSyntaxError(err.decode("utf8", "ignore"))
+                        final_pages.add(page)
+                        continue
+                    if page_images:
+                        images[page] = page_images[0]
+                    else:
+                        errors[page] = PDFRenderError(_render_error(returncode, err))
+        except PDFPopplerTimeoutError:
+            # No process can be spawned anymore, the pages rendered so far are returned
+            pass
+    finally:
+        process_group.close()
+        if output_folder is not None:
+            shutil.rmtree(output_folder, ignore_errors=True)
+
+    results = []
+    for page in pages:
+        error = None
+        if page not in images:
+            error = errors.get(page)
+            if process_group.timed_out and page not in final_pages:
+                error = PDFPopplerTimeoutError('Poppler timed out before rendering page %d' % page)
+        results.append(PageResult(page, images.get(page), error, attempts[page]))
+    return results
+
+
+def _render_ranges(pdf_path, first_page, last_page, dpi, fmt, parse_buffer_func, thread_count, userpw, use_cropbox,
+                   strict, transparent, grayscale, installation, process_group, images, errors, attempts):
+    # A process per range as convert_from_path does, the pages it did not output are left to the retries
+    processes = []
+    # Never more processes than pages
+    thread_count = min(max(1, thread_count), last_page - first_page + 1)
+    for range_first_page, range_last_page in _split_pages(first_page, last_page, thread_count):
+        args = _build_command(['-r', str(dpi), pdf_path], None, range_first_page, range_last_page, fmt, None,
+                              userpw, use_cropbox, transparent, False, grayscale)
+        proc = process_group.spawn([installation.command_path('pdftoppm')] + args)
+        processes.append((range(range_first_page, range_last_page + 1), time.time(), proc))
+
+    for range_pages, spawn_time, proc in processes:
+        data, err = _communicate(proc)
+        for page in range_pages:
+            attempts[page] += 1
+
+        if b'Syntax Error' in err and strict:
+            # The error does not tell which page printed it, the pages of the range are retried one by one
+            for page in range_pages:
+                errors[page] = PDFSyntaxError(err.decode("utf8", "ignore"))
+            continue
+
+        # The pages are output in order, the ones after a crash are missing
+        range_images = parse_buffer_func(data)
+        _record_pages(len(range_images), len(data), time.time() - spawn_time, dpi, fmt)
+        for page, image in zip(range_pages, range_images):
+            images[page] = image
+        for page in range_pages:
+            if page not in images:
+                errors[page] = PDFRenderError(_render_error(proc.returncode, err))
+
+
+def _render_single_pages_to_folder(pdf_path, pages, dpi, fmt, userpw, use_cropbox, transparent, grayscale,
+                                   thread_count, installation, process_group, output_folder):
+    # Same as _render_single_pages for TIFF, that pdftocairo can only write to a file,
+    # yields (page, images, returncode, err) with the loaded image of the page in images
+    def finish(page, spawn_time, proc):
+        _, err = proc.communicate()
+        path = os.path.join(output_folder, 'page_%d.tif' % page)
+        page_images = []
+        if proc.returncode == 0 and os.path.exists(path):
+            image = Image.open(path)
+            image.load()
+            page_images.append(image)
+            _record_pages(1, os.path.getsize(path), time.time() - spawn_time, dpi, fmt)
+        if os.path.exists(path):
+            os.remove(path)
+        return page, page_images, proc.returncode, err
+
+    processes = deque()
+    for page in pages:
+        if len(processes) == thread_count:
+            yield finish(*processes.popleft())
+        args = _build_command(['-r', str(dpi), pdf_path], output_folder, page, page, fmt, 'page_%d' % page, userpw,
+                              use_cropbox, transparent, True, grayscale)
+        processes.append((page, time.time(), process_group.spawn([installation.command_path('pdftocairo')] + args)))
+
+    while processes:
+        yield finish(*processes.popleft())
+
+
+def _render_error(returncode, err):
+    message = err.decode("utf8", "ignore").strip()
+    if returncode is not None and returncode != 0:
+        message = 'Poppler exited with code %d. %s' % (returncode, message)
+    return message or 'Poppler did not output the page'
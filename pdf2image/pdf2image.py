@@ -3,34 +3,58 @@
     PDFs into Pillow images.
 """
 
+import math
 import os
-import platform
 import re
-import uuid
 import tempfile
 import shutil
+import threading
+import time
 
+from collections import deque, namedtuple
+from io import BytesIO
 from subprocess import Popen, PIPE
-from PIL import Image
+
+from .installation import get_poppler_installation
+from .metrics import get_registry, _record_pages, _record_spawn
 
 from .parsers import (
     parse_buffer_to_ppm,
     parse_buffer_to_jpeg,
-    parse_buffer_to_png
+    parse_buffer_to_png,
+    jpeg_file_size,
+    png_file_size,
+    ppm_file_size
 )
 
 from .exceptions import (
     PDFInfoNotInstalledError,
     PDFPageCountError,
-    PDFSyntaxError
+    PDFSyntaxError,
+    PDFPopplerTimeoutError,
+    PDFPopplerResourceError,
+    PDFPixelLimitError,
+    PDFRenderError
 )
 
 TRANSPARENT_FILE_TYPES = ['png', 'tiff']
 
+# Size of the file at the start of a buffer and the bytes that end it, to split the pages a process writes to stdout
+PAGE_SPLITTERS = {
+    'ppm': (ppm_file_size, None),
+    'png': (png_file_size, b'IEND'),
+    'jpeg': (jpeg_file_size, b'\xff\xd9'),
+}
+
+# Size of a page in points (1/72 inch) for its media box and crop box, and its rotation in degrees
+PageInfo = namedtuple('PageInfo', ['page', 'width', 'height', 'crop_width', 'crop_height', 'rotation'])
+
 
 def convert_from_path(pdf_path, dpi=200, output_folder=None, first_page=None, last_page=None,
                       fmt='ppm', thread_count=1, userpw=None, use_cropbox=False, strict=False, transparent=False,
-                      single_file=False, output_file=str(uuid.uuid4()), poppler_path=None, grayscale=False):
+                      single_file=False, output_file=None, poppler_path=None, grayscale=False,
+                      timeout=None, max_memory=None, max_cpu_time=None, max_pixels=None, mono=False,
+                      backend=None, ownerpw=None, decrypt=False, postprocess=None, postprocess_workers=None):
     """
         Description: Convert PDF to Image will throw whenever one of the condition is reached
         Parameters:
@@ -46,35 +70,179 @@ def convert_from_path(pdf_path, dpi=200, output_folder=None, first_page=None, la
             strict -> When a Syntax Error is thrown, it will be raised as an Exception
             transparent -> Output with a transparent background instead of a white one.
             single_file -> Uses the -singlefile option from pdftoppm/pdftocairo
-            output_file -> What is the output filename
+            output_file -> What is the output filename, a random one is generated when None
             poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+            max_memory -> Address space limit of each poppler process in bytes (POSIX only)
+            max_cpu_time -> CPU time limit of each poppler process in seconds (POSIX only)
+            max_pixels -> Raise PDFPixelLimitError before rendering if the pages would have more pixels in total
+            mono -> Output monochrome image(s), 1 bit per pixel
+            backend -> Renderer to use, one of pdf2image.backends.BACKENDS, pdftoppm or pdftocairo depending
+                       on the format when None. The in process backends (poppler-glib, pypdfium2) and mutool
+                       keep the parsed documents open for the next conversions, they always render the crop box
+                       and do not use poppler_path, timeout, max_memory, max_cpu_time, use_cropbox and strict
+            ownerpw -> PDF's owner password
+            decrypt -> Decrypt the PDF once with qpdf (in /dev/shm when available) and render the decrypted copy,
+                       instead of having every poppler process decrypt it, passwords are given to poppler
+                       as usual when qpdf is not installed
+            postprocess -> Function called on every image in a process pool while the next pages are rendered,
+                           its results are returned instead of the images, in page order (it must be picklable)
+            postprocess_workers -> Number of postprocess processes, the number of CPUs when None
 
     """
 
-    page_count = _page_count(pdf_path, userpw, poppler_path=poppler_path)
+    decrypted_path = _decrypt(pdf_path, userpw, ownerpw) if decrypt else None
+    if decrypted_path is not None:
+        pdf_path, userpw, ownerpw = decrypted_path, None, None
+
+    postprocessor = None
+    start_time = time.time()
+    try:
+        # Created in the try block, the decrypted copy is removed even if the pool can not be started
+        if postprocess is not None:
+            postprocessor = _PostProcessor(postprocess, postprocess_workers)
+
+        if backend not in (None, 'pdftoppm', 'pdftocairo'):
+            # The in process backends accept either password
+            images = _convert_in_process(backend, pdf_path, dpi, output_folder, first_page, last_page, fmt,
+                                         thread_count, userpw if userpw is not None else ownerpw, transparent,
+                                         single_file, output_file, grayscale, mono, max_pixels)
+            if postprocessor is not None:
+                postprocessor.submit(images)
+        else:
+            process_group = _ProcessGroup(get_poppler_installation(poppler_path).env, timeout,
+                                          _get_resource_limiter(max_memory, max_cpu_time))
+            try:
+                images = _convert(pdf_path, dpi, output_folder, first_page, last_page, fmt, thread_count, userpw,
+                                  use_cropbox, strict, transparent, single_file, output_file, poppler_path,
+                                  grayscale, mono, max_pixels, backend, ownerpw, postprocessor, process_group)
+            finally:
+                process_group.close()
+
+        return images if postprocessor is None else postprocessor.results()
+    finally:
+        if postprocessor is not None:
+            postprocessor.close()
+        if decrypted_path is not None:
+            _discard_documents(backend, decrypted_path)
+            os.remove(decrypted_path)
+        _record_conversion(time.time() - start_time, dpi, fmt)
+
+
+def _record_conversion(seconds, dpi, fmt):
+    registry = get_registry()
+    if registry.enabled:
+        labels = {'dpi': str(dpi), 'fmt': _parse_format(fmt)[0]}
+        registry.inc('pdf2image_conversions_total', **labels)
+        registry.observe('pdf2image_conversion_seconds', seconds, **labels)
+
+
+def _discard_documents(backend, pdf_path):
+    # pdf_path is a temporary copy, a new one is used every time and its documents could never be reused
+    if backend not in (None, 'pdftoppm', 'pdftocairo'):
+        from .backends import _document_cache
+        _document_cache.discard(pdf_path)
+
+
+def _convert_in_process(backend, pdf_path, dpi, output_folder, first_page, last_page, fmt, thread_count, userpw,
+                        transparent, single_file, output_file, grayscale, mono, max_pixels):
+    from .backends import BACKENDS, _convert_in_process
+
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend %r, expected one of %s' % (backend, ', '.join(BACKENDS)))
+
+    if output_file is None:
+        import uuid
+        output_file = str(uuid.uuid4())
+
+    parsed_fmt, final_extension, _, _ = _parse_format(fmt, grayscale, mono)
+
+    return _convert_in_process(backend, pdf_path, dpi, output_folder, first_page, last_page, parsed_fmt,
+                               thread_count, userpw, transparent and parsed_fmt in TRANSPARENT_FILE_TYPES,
+                               single_file, output_file, final_extension, grayscale, mono, max_pixels)
+
+
+def _convert(pdf_path, dpi, output_folder, first_page, last_page, fmt, thread_count, userpw, use_cropbox, strict,
+             transparent, single_file, output_file, poppler_path, grayscale, mono, max_pixels, backend, ownerpw,
+             postprocessor, process_group):
+    if output_file is None:
+        # Imported here as uuid is slow to import
+        import uuid
+        output_file = str(uuid.uuid4())
 
     # We start by getting the output format, the buffer processing function and if we need pdftocairo
-    parsed_fmt, final_extension, parse_buffer_func, use_pdfcairo_format = _parse_format(fmt)
+    parsed_fmt, final_extension, parse_buffer_func, use_pdfcairo_format = _parse_format(fmt, grayscale, mono)
 
     # We use pdftocairo is the format requires it OR we need a transparent output
     use_pdfcairo = use_pdfcairo_format or (transparent and parsed_fmt in TRANSPARENT_FILE_TYPES)
 
+    if backend == 'pdftocairo':
+        if parsed_fmt == 'ppm':
+            raise ValueError('pdftocairo can not write PPM files, use the pdftoppm backend')
+        use_pdfcairo = True
+    elif backend == 'pdftoppm':
+        if transparent and parsed_fmt in TRANSPARENT_FILE_TYPES:
+            raise ValueError('pdftoppm can not render a transparent background, use the pdftocairo backend')
+        # pdftoppm writes TIFF files as well
+        use_pdfcairo = False
+
+    installation = get_poppler_installation(poppler_path)
+    command = 'pdftocairo' if use_pdfcairo else 'pdftoppm'
+
+    # Poppler versions without -mono or -gray render in color and the images are converted once loaded
+    convert_mode = None
+    if mono and not installation.supports(command, '-mono'):
+        mono, convert_mode = False, '1'
+    elif grayscale and not installation.supports(command, '-gray'):
+        grayscale, convert_mode = False, 'L'
+    if convert_mode is not None:
+        parsed_fmt, final_extension, parse_buffer_func, _ = _parse_format(fmt, grayscale, mono)
+
     if thread_count < 1:
         thread_count = 1
 
-    if first_page is None:
-        first_page = 1
+    # pdfinfo is only needed for the page count and the page sizes, when the pages are not checked against
+    # max_pixels the page count is given by the first pdftoppm process once it rendered its first page
+    if (output_folder is None and parsed_fmt == 'ppm' and not use_pdfcairo and max_pixels is None
+            and installation.supports('pdftoppm', '-progress')):
+        return _convert_single_pass(pdf_path, dpi, first_page, last_page, parsed_fmt, thread_count, userpw,
+                                    use_cropbox, strict, single_file, grayscale, mono, ownerpw, parse_buffer_func,
+                                    convert_mode, postprocessor, installation, process_group)
+
+    info = _pdfinfo(pdf_path, userpw, poppler_path, process_group, last_page, ownerpw)
+    page_count = info['Pages']
+
+    # Like poppler, pages before the first one are the first one, the ranges below start at page 1
+    first_page = 1 if first_page is None else max(1, first_page)
 
     if last_page is None or last_page > page_count:
         last_page = page_count
 
+    if single_file:
+        last_page = first_page
+
     if first_page > last_page:
         return []
 
-    auto_temp_dir = False
-    if output_folder is None and use_pdfcairo:
-        auto_temp_dir = True
-        output_folder = tempfile.mkdtemp()
+    # Pixel size of every page, used to reject documents that are too big and to balance the workers
+    pixel_sizes = {}
+    for page_info in info['page_info']:
+        if first_page <= page_info.page <= last_page:
+            pixel_sizes[page_info.page] = _pixel_size(page_info, dpi, use_cropbox)
+
+    if max_pixels is not None:
+        pixel_count = sum(width * height for width, height in pixel_sizes.values())
+        if pixel_count > max_pixels:
+            raise PDFPixelLimitError(
+                'Rendering pages %d to %d at %s DPI would produce %d pixels, the limit is %d' % (
+                    first_page, last_page, dpi, pixel_count, max_pixels
+                )
+            )
+
+    # pdftocairo can only write a single page to stdout, so in-memory PNG outputs are
+    # rendered one process per page instead of going through a temporary folder
+    stream_pages = output_folder is None and use_pdfcairo and parsed_fmt == 'png'
 
     # Recalculate page count based on first and last page
     page_count = last_page - first_page + 1
@@ -82,65 +250,222 @@ def convert_from_path(pdf_path, dpi=200, output_folder=None, first_page=None, la
     if thread_count > page_count:
         thread_count = page_count
 
-    reminder = page_count % thread_count
-    current_page = first_page
-    processes = []
-    for i in range(thread_count):
-        thread_output_file = output_file + '_' + str(i) if thread_count > 1 else output_file 
-        # Get the number of pages the thread will be processing
-        thread_page_count = page_count // thread_count + int(reminder > 0)
-        # Build the command accordingly
-        args = _build_command(
-            ['-r', str(dpi), pdf_path],
-            output_folder,
-            current_page,
-            current_page + thread_page_count - 1,
-            parsed_fmt,
-            thread_output_file,
-            userpw,
-            use_cropbox,
-            transparent,
-            single_file,
-            grayscale,
-        )
+    images = []
 
-        if use_pdfcairo:
-            args = [_get_command_path('pdftocairo', poppler_path)] + args
+    if stream_pages:
+        for page, data, err in _render_single_pages(
+                pdf_path,
+                range(first_page, last_page + 1),
+                dpi,
+                parsed_fmt,
+                userpw,
+                use_cropbox,
+                transparent,
+                grayscale,
+                use_pdfcairo,
+                thread_count,
+                poppler_path,
+                process_group,
+                mono=mono,
+                ownerpw=ownerpw):
+            process_group.check(images)
+            if b'Syntax Error' in err and strict:
+                raise PDFSyntaxError(err.decode("utf8", "ignore"))
+            new_images = parse_buffer_func(data)
+            _check_rendered(new_images, page, page, None, err)
+            images += _collect_images(new_images, convert_mode, postprocessor)
+        return images
+
+    auto_temp_dir = False
+    # pdftocairo only writes a single page to stdout and TIFF files have no parser, whichever renderer writes them
+    if output_folder is None and (use_pdfcairo or parse_buffer_func is None):
+        auto_temp_dir = True
+        output_folder = tempfile.mkdtemp()
+
+    try:
+        if len(pixel_sizes) == page_count:
+            page_costs = dict((page, width * height) for page, (width, height) in pixel_sizes.items())
         else:
-            args = [_get_command_path('pdftoppm', poppler_path)] + args
-
-        # Update page values
-        current_page = current_page + thread_page_count
-        reminder -= int(reminder > 0)
-        # Add poppler path to LD_LIBRARY_PATH
-        env = os.environ.copy()
-        if poppler_path is not None:
-            env["LD_LIBRARY_PATH"] = poppler_path + ":" + env.get("LD_LIBRARY_PATH", "")
-        # Spawn the process and save its uuid
-        processes.append((thread_output_file, Popen(args, env=env, stdout=PIPE, stderr=PIPE)))
+            page_costs = None
 
-    images = []
+        processes = []
+        page_ranges = _split_pages(first_page, last_page, thread_count, page_costs)
+        for i, (range_first_page, range_last_page) in enumerate(page_ranges):
+            thread_output_file = output_file + '_' + str(i) if len(page_ranges) > 1 else output_file
+            # Build the command accordingly
+            args = _build_command(
+                ['-r', str(dpi), pdf_path],
+                output_folder,
+                range_first_page,
+                range_last_page,
+                parsed_fmt,
+                thread_output_file,
+                userpw,
+                use_cropbox,
+                transparent,
+                single_file,
+                grayscale,
+                mono,
+                ownerpw,
+            )
+
+            args = [installation.command_path(command)] + args
+
+            # The exact size of PPM outputs is known, the buffer receiving them is allocated once
+            size_hint = None
+            if output_folder is None and parsed_fmt == 'ppm':
+                size_hint = sum(
+                    _ppm_size(pixel_sizes[page], grayscale, mono)
+                    for page in range(range_first_page, range_last_page + 1)
+                    if page in pixel_sizes
+                )
+
+            # Spawn the process and save its uuid
+            processes.append((thread_output_file, range_first_page, range_last_page, size_hint, time.time(),
+                              process_group.spawn(args)))
+
+        for uid, range_first_page, range_last_page, size_hint, spawn_time, proc in processes:
+            data, err = _communicate(proc, size_hint)
+            render_time = time.time() - spawn_time
+
+            # Pages rendered by the previous processes are kept in the exception
+            process_group.check(images)
+
+            if b'Syntax Error'in err and strict:
+                raise PDFSyntaxError(err.decode("utf8", "ignore"))
+
+            if output_folder is not None:
+                new_images = _load_from_output_folder(output_folder, uid, final_extension, in_memory=auto_temp_dir)
+                _record_pages(len(new_images), None, render_time, dpi, parsed_fmt)
+            else:
+                new_images = parse_buffer_func(data)
+                _record_pages(len(new_images), len(data), render_time, dpi, parsed_fmt)
+            _check_rendered(new_images, range_first_page, range_last_page, proc.returncode, err)
+            images += _collect_images(new_images, convert_mode, postprocessor)
+    finally:
+        if auto_temp_dir:
+            shutil.rmtree(output_folder)
+
+    return images
 
-    for uid, proc in processes:
-        data, err = proc.communicate()
 
-        if b'Syntax Error'in err and strict:
+def _convert_single_pass(pdf_path, dpi, first_page, last_page, fmt, thread_count, userpw, use_cropbox, strict,
+                         single_file, grayscale, mono, ownerpw, parse_buffer_func, convert_mode, postprocessor,
+                         installation, process_group):
+    first_page = 1 if first_page is None else max(1, first_page)
+
+    if single_file:
+        last_page = first_page
+
+    if last_page is not None and first_page > last_page:
+        return []
+
+    command_path = installation.command_path('pdftoppm')
+
+    # The first process renders every page from first_page on, -progress prints "<page> <last page> <file>"
+    # once a page is output so the rest of the pages can be given to the other processes
+    args = _build_command(['-r', str(dpi), '-progress', pdf_path], None, first_page, last_page, fmt, None, userpw,
+                          use_cropbox, False, single_file, grayscale, mono, ownerpw)
+    spawn_time = time.time()
+    first_proc = process_group.spawn([command_path] + args)
+    reader = _PageStreamReader(first_proc, process_group)
+
+    processes = []
+    err = []
+    for line in iter(first_proc.stderr.readline, b''):
+        progress = re.match(br'(\d+) (\d+) ', line)
+        if progress is None:
+            err.append(line)
+            continue
+        if reader.page_limit is not None:
+            continue
+        page, last_page = int(progress.group(1)), int(progress.group(2))
+        # Never more processes than pages left
+        page_ranges = _split_pages(page + 1, last_page, min(thread_count, last_page - page)) \
+            if thread_count > 1 and page < last_page else []
+        if not page_ranges:
+            # The first process renders every page
+            reader.limit(last_page - first_page + 1)
+            continue
+        reader.limit(page_ranges[0][1] - first_page + 1)
+        for range_first_page, range_last_page in page_ranges[1:]:
+            args = _build_command(['-r', str(dpi), pdf_path], None, range_first_page, range_last_page, fmt, None,
+                                  userpw, use_cropbox, False, False, grayscale, mono, ownerpw)
+            processes.append((range_first_page, range_last_page, time.time(),
+                              process_group.spawn([command_path] + args)))
+
+    data = reader.join()
+    err = b''.join(err)
+    render_time = time.time() - spawn_time
+
+    process_group.check([])
+
+    if b'Syntax Error' in err and strict:
+        raise PDFSyntaxError(err.decode("utf8", "ignore"))
+
+    if reader.page_limit is None:
+        # No page was output, first_page is after the end of the document or it could not be opened
+        if b'Wrong page range' in err:
+            return []
+        raise PDFPageCountError('Unable to get page count. %s' % err.decode("utf8", "ignore"))
+
+    new_images = parse_buffer_func(data)
+    _record_pages(len(new_images), len(data), render_time, dpi, fmt)
+    _check_rendered(new_images, first_page, first_page + reader.page_limit - 1, first_proc.returncode, err)
+    images = _collect_images(new_images, convert_mode, postprocessor)
+
+    for range_first_page, range_last_page, spawn_time, proc in processes:
+        data, err = _communicate(proc)
+        render_time = time.time() - spawn_time
+
+        process_group.check(images)
+
+        if b'Syntax Error' in err and strict:
             raise PDFSyntaxError(err.decode("utf8", "ignore"))
 
-        if output_folder is not None:
-            images += _load_from_output_folder(output_folder, uid, final_extension, in_memory=auto_temp_dir)
-        else:
-            images += parse_buffer_func(data)
+        new_images = parse_buffer_func(data)
+        _record_pages(len(new_images), len(data), render_time, dpi, fmt)
+        _check_rendered(new_images, range_first_page, range_last_page, proc.returncode, err)
+        images += _collect_images(new_images, convert_mode, postprocessor)
+
+    return images
 
-    if auto_temp_dir:
-        shutil.rmtree(output_folder)
 
+def _check_rendered(images, first_page, last_page, returncode, err):
+    # A process that crashed output fewer pages, returning them would shift every page after the gap
+    if len(images) < last_page - first_page + 1:
+        message = err.decode("utf8", "ignore").strip()
+        if returncode is not None and returncode != 0:
+            message = 'Poppler exited with code %d. %s' % (returncode, message)
+        raise PDFRenderError(
+            'Poppler output %d of pages %d to %d, pdf2image.partial.convert_partial returns the pages that '
+            'could be rendered. %s' % (len(images), first_page, last_page, message)
+        )
+
+
+def _check_exited(first_page, last_page, returncode, err):
+    # Poppler wrote to a file descriptor, its exit status is the only way to know that every page was output
+    if returncode != 0:
+        raise PDFRenderError(
+            'Poppler exited with code %d while rendering pages %d to %d. %s'
+            % (returncode, first_page, last_page, err.decode("utf8", "ignore").strip())
+        )
+
+
+def _collect_images(images, mode, postprocessor):
+    if mode is not None:
+        images = [image.convert(mode) for image in images]
+    # Post-processing starts while the next pages are still being rendered
+    if postprocessor is not None:
+        postprocessor.submit(images)
     return images
 
 
 def convert_from_bytes(pdf_file, dpi=200, output_folder=None, first_page=None, last_page=None,
                        fmt='ppm', thread_count=1, userpw=None, use_cropbox=False, strict=False, transparent=False,
-                       single_file=False, output_file=str(uuid.uuid4()), poppler_path=None):
+                       single_file=False, output_file=None, poppler_path=None, timeout=None,
+                       max_memory=None, max_cpu_time=None, max_pixels=None, grayscale=False, mono=False, backend=None,
+                       ownerpw=None, decrypt=False, postprocess=None, postprocess_workers=None):
     """
         Description: Convert PDF to Image will throw whenever one of the condition is reached
         Parameters:
@@ -156,8 +481,20 @@ def convert_from_bytes(pdf_file, dpi=200, output_folder=None, first_page=None, l
             strict -> When a Syntax Error is thrown, it will be raised as an Exception
             transparent -> Output with a transparent background instead of a white one.
             single_file -> Uses the -singlefile option from pdftoppm/pdftocairo
-            output_file -> What is the output filename
+            output_file -> What is the output filename, a random one is generated when None
             poppler_path -> Path to look for poppler binaries
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+            max_memory -> Address space limit of each poppler process in bytes (POSIX only)
+            max_cpu_time -> CPU time limit of each poppler process in seconds (POSIX only)
+            max_pixels -> Raise PDFPixelLimitError before rendering if the pages would have more pixels in total
+            grayscale -> Output grayscale image(s)
+            mono -> Output monochrome image(s), 1 bit per pixel
+            backend -> Renderer to use, one of pdf2image.backends.BACKENDS, pdftoppm or pdftocairo depending
+                       on the format when None
+            ownerpw -> PDF's owner password
+            decrypt -> Decrypt the PDF once with qpdf and render the decrypted copy
+            postprocess -> Function called on every image in a process pool, its results are returned in page order
+            postprocess_workers -> Number of postprocess processes, the number of CPUs when None
     """
 
     fh, temp_filename = tempfile.mkstemp()
@@ -168,13 +505,325 @@ def convert_from_bytes(pdf_file, dpi=200, output_folder=None, first_page=None, l
             return convert_from_path(f.name, dpi=dpi, output_folder=output_folder,
                                      first_page=first_page, last_page=last_page, fmt=fmt, thread_count=thread_count,
                                      userpw=userpw, use_cropbox=use_cropbox, strict=strict, transparent=transparent,
-                                     single_file=single_file, output_file=output_file, poppler_path=poppler_path)
+                                     single_file=single_file, output_file=output_file, poppler_path=poppler_path,
+                                     timeout=timeout, max_memory=max_memory, max_cpu_time=max_cpu_time,
+                                     max_pixels=max_pixels, grayscale=grayscale, mono=mono, backend=backend,
+                                     ownerpw=ownerpw, decrypt=decrypt, postprocess=postprocess,
+                                     postprocess_workers=postprocess_workers)
     finally:
+        _discard_documents(backend, temp_filename)
         os.close(fh)
         os.remove(temp_filename)
 
 
-def _build_command(args, output_folder, first_page, last_page, fmt, output_file, userpw, use_cropbox, transparent, single_file, grayscale):
+def convert_to_archive(pdf_path, dest, dpi=200, first_page=None, last_page=None, fmt='png', thread_count=1,
+                       userpw=None, use_cropbox=False, strict=False, transparent=False, output_file='page',
+                       poppler_path=None, grayscale=False, archive_format=None, timeout=None, max_memory=None,
+                       max_cpu_time=None, mono=False):
+    """
+        Description: Convert PDF pages and write them to a ZIP or TAR archive as they are rendered,
+                     only one encoded page per running process is kept in memory
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            dest -> Path or writable file object of the archive
+            dpi -> Image quality in DPI (default 200)
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            fmt -> Output image format (default png)
+            thread_count -> How many threads we are allowed to spawn for processing
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            transparent -> Output with a transparent background instead of a white one.
+            output_file -> Prefix of the archive members
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            archive_format -> 'zip', 'tar', 'tar.gz' or 'tar.bz2', guessed from dest when None
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+            max_memory -> Address space limit of each poppler process in bytes (POSIX only)
+            max_cpu_time -> CPU time limit of each poppler process in seconds (POSIX only)
+            mono -> Output monochrome image(s), 1 bit per pixel
+        Returns the number of pages written to the archive
+    """
+
+    process_group = _ProcessGroup(get_poppler_installation(poppler_path).env, timeout,
+                                  _get_resource_limiter(max_memory, max_cpu_time))
+    try:
+        return _convert_to_archive(pdf_path, dest, dpi, first_page, last_page, fmt, thread_count, userpw,
+                                   use_cropbox, strict, transparent, output_file, poppler_path, grayscale, mono,
+                                   archive_format, process_group)
+    finally:
+        process_group.close()
+
+
+def _convert_to_archive(pdf_path, dest, dpi, first_page, last_page, fmt, thread_count, userpw, use_cropbox, strict,
+                        transparent, output_file, poppler_path, grayscale, mono, archive_format, process_group):
+    import tarfile
+    import zipfile
+
+    first_page, last_page, page_count = _page_range(pdf_path, first_page, last_page, userpw, poppler_path,
+                                                    process_group)
+
+    parsed_fmt, final_extension, _, _ = _parse_format(fmt, grayscale, mono)
+
+    if archive_format is None:
+        archive_format = _guess_archive_format(dest)
+
+    if archive_format == 'zip':
+        # Only PPM benefits from compression, the other formats are already compressed
+        archive = zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED if parsed_fmt == 'ppm' else zipfile.ZIP_STORED)
+        write_member = archive.writestr
+    else:
+        mode = 'w' if archive_format == 'tar' else 'w:' + archive_format.split('.')[-1]
+        if hasattr(dest, 'write'):
+            archive = tarfile.open(fileobj=dest, mode=mode)
+        else:
+            archive = tarfile.open(dest, mode=mode)
+
+        def write_member(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            archive.addfile(info, BytesIO(data))
+
+    def write_page(page, data):
+        # Same naming as poppler, the page number is padded to the number of digits of the page count
+        write_member('{}-{}.{}'.format(output_file, str(page).zfill(len(str(page_count))), final_extension), data)
+
+    try:
+        return _convert_to_sink(pdf_path, write_page, dpi, first_page, last_page, fmt, thread_count, userpw,
+                                use_cropbox, strict, transparent, poppler_path, grayscale, mono, process_group)
+    finally:
+        archive.close()
+
+
+def convert_to_sink(pdf_path, sink, dpi=200, first_page=None, last_page=None, fmt='ppm', thread_count=1,
+                    userpw=None, use_cropbox=False, strict=False, transparent=False, poppler_path=None,
+                    grayscale=False, timeout=None, max_memory=None, max_cpu_time=None, mono=False):
+    """
+        Description: Convert PDF pages and hand their encoded bytes to a sink as they are rendered
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            sink -> Callable receiving (page_number, data) for every page, or a writable file object or
+                    file descriptor to which the pages are written one after the other. With one thread and
+                    a sink backed by a file descriptor (file, pipe, socket), poppler writes to it directly
+                    (TIFF files are always rendered to a temporary folder first, they can not be written to a pipe)
+            dpi -> Image quality in DPI (default 200)
+            first_page -> First page to process
+            last_page -> Last page to process before stopping
+            fmt -> Output image format
+            thread_count -> How many threads we are allowed to spawn for processing
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            transparent -> Output with a transparent background instead of a white one.
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+            max_memory -> Address space limit of each poppler process in bytes (POSIX only)
+            max_cpu_time -> CPU time limit of each poppler process in seconds (POSIX only)
+            mono -> Output monochrome image(s), 1 bit per pixel
+        Returns the number of pages converted
+    """
+
+    process_group = _ProcessGroup(get_poppler_installation(poppler_path).env, timeout,
+                                  _get_resource_limiter(max_memory, max_cpu_time))
+    try:
+        first_page, last_page, _ = _page_range(pdf_path, first_page, last_page, userpw, poppler_path, process_group)
+        return _convert_to_sink(pdf_path, sink, dpi, first_page, last_page, fmt, thread_count, userpw,
+                                use_cropbox, strict, transparent, poppler_path, grayscale, mono, process_group)
+    finally:
+        process_group.close()
+
+
+def _convert_to_sink(pdf_path, sink, dpi, first_page, last_page, fmt, thread_count, userpw, use_cropbox, strict,
+                     transparent, poppler_path, grayscale, mono, process_group):
+    parsed_fmt, _, _, use_pdfcairo_format = _parse_format(fmt, grayscale, mono)
+
+    use_pdfcairo = use_pdfcairo_format or (transparent and parsed_fmt in TRANSPARENT_FILE_TYPES)
+
+    if thread_count < 1:
+        thread_count = 1
+
+    if first_page > last_page:
+        return 0
+
+    fileno = None if callable(sink) else _get_fileno(sink)
+
+    # libtiff seeks back to write the directory offset, TIFF files can not be written to a pipe
+    if fileno is not None and thread_count == 1 and parsed_fmt != 'tiff':
+        # Poppler writes straight to the sink, the pages never go through python
+        if hasattr(sink, 'flush'):
+            sink.flush()
+        if use_pdfcairo:
+            processes = _render_single_pages(pdf_path, range(first_page, last_page + 1), dpi, parsed_fmt, userpw,
+                                             use_cropbox, transparent, grayscale, use_pdfcairo, thread_count,
+                                             poppler_path, process_group, stdout=fileno, mono=mono)
+        else:
+            args = _build_command(['-r', str(dpi), pdf_path], None, first_page, last_page, parsed_fmt, None,
+                                  userpw, use_cropbox, transparent, False, grayscale, mono)
+            spawn_time = time.time()
+            proc = process_group.spawn([_get_command_path('pdftoppm', poppler_path)] + args, stdout=fileno)
+            processes = [(None,) + proc.communicate()]
+            process_group.check()
+            _check_exited(first_page, last_page, proc.returncode, processes[0][2])
+            _record_pages(last_page - first_page + 1, None, time.time() - spawn_time, dpi, parsed_fmt)
+        for _, _, err in processes:
+            process_group.check()
+            if b'Syntax Error' in err and strict:
+                raise PDFSyntaxError(err.decode("utf8", "ignore"))
+        return last_page - first_page + 1
+
+    if callable(sink):
+        write_page = sink
+    elif isinstance(sink, int):
+        def write_page(page, data):
+            view = memoryview(data)
+            while view:
+                view = view[os.write(sink, view):]
+    else:
+        def write_page(page, data):
+            sink.write(data)
+
+    if parsed_fmt == 'tiff':
+        return _convert_tiff_to_sink(pdf_path, write_page, dpi, first_page, last_page, thread_count, userpw,
+                                     use_cropbox, strict, transparent, poppler_path, grayscale, mono, process_group)
+
+    if use_pdfcairo:
+        # pdftocairo only writes a single page to stdout, every page has its own process
+        page_count = 0
+        for page, data, err in _render_single_pages(
+                pdf_path,
+                range(first_page, last_page + 1),
+                dpi,
+                parsed_fmt,
+                userpw,
+                use_cropbox,
+                transparent,
+                grayscale,
+                use_pdfcairo,
+                thread_count,
+                poppler_path,
+                process_group,
+                mono=mono):
+            process_group.check()
+            if b'Syntax Error' in err and strict:
+                raise PDFSyntaxError(err.decode("utf8", "ignore"))
+            write_page(page, data)
+            page_count += 1
+
+        return page_count
+
+    # A process per range as convert_from_path does, the pages are split from its stdout as soon as they are complete
+    file_size_func, end_marker = PAGE_SPLITTERS[parsed_fmt]
+    processes = []
+    for range_first_page, range_last_page in _split_pages(first_page, last_page,
+                                                          min(thread_count, last_page - first_page + 1)):
+        args = _build_command(['-r', str(dpi), pdf_path], None, range_first_page, range_last_page, parsed_fmt, None,
+                              userpw, use_cropbox, transparent, False, grayscale, mono)
+        processes.append((range_first_page, range_last_page, time.time(),
+                          process_group.spawn([_get_command_path('pdftoppm', poppler_path)] + args)))
+
+    page_count = 0
+    for range_first_page, range_last_page, spawn_time, proc in processes:
+        err = []
+        sizes = []
+        pending_pages = []
+        for data in _stream_pages(proc, file_size_func, end_marker, err):
+            if strict:
+                # The pages are only written once the range is known to have no syntax error
+                pending_pages.append(data)
+            else:
+                write_page(range_first_page + len(sizes), data)
+            sizes.append(len(data))
+        err = err[0]
+
+        process_group.check()
+
+        if b'Syntax Error' in err and strict:
+            raise PDFSyntaxError(err.decode("utf8", "ignore"))
+
+        _check_rendered(sizes, range_first_page, range_last_page, proc.returncode, err)
+        for i, data in enumerate(pending_pages):
+            write_page(range_first_page + i, data)
+        _record_pages(len(sizes), sum(sizes), time.time() - spawn_time, dpi, parsed_fmt)
+        page_count += len(sizes)
+
+    return page_count
+
+
+def _convert_tiff_to_sink(pdf_path, write_page, dpi, first_page, last_page, thread_count, userpw, use_cropbox, strict,
+                          transparent, poppler_path, grayscale, mono, process_group):
+    # The pages are rendered to a temporary folder, every file is removed once it was handed to the sink
+    output_folder = tempfile.mkdtemp()
+    try:
+        processes = []
+        for i, (range_first_page, range_last_page) in enumerate(
+                _split_pages(first_page, last_page, min(thread_count, last_page - first_page + 1))):
+            output_file = 'range_%d' % i
+            args = _build_command(['-r', str(dpi), pdf_path], output_folder, range_first_page, range_last_page,
+                                  'tiff', output_file, userpw, use_cropbox, transparent, False, grayscale, mono)
+            processes.append((output_file, range_first_page, range_last_page, time.time(),
+                              process_group.spawn([_get_command_path('pdftocairo', poppler_path)] + args)))
+
+        page_count = 0
+        for output_file, range_first_page, range_last_page, spawn_time, proc in processes:
+            _, err = proc.communicate()
+
+            process_group.check()
+
+            if b'Syntax Error' in err and strict:
+                raise PDFSyntaxError(err.decode("utf8", "ignore"))
+
+            output_file_pattern = re.compile(re.escape(output_file) + r'-\d+\.tif$')
+            paths = [os.path.join(output_folder, f) for f in sorted(os.listdir(output_folder))
+                     if output_file_pattern.match(f)]
+            _check_rendered(paths, range_first_page, range_last_page, proc.returncode, err)
+            byte_count = 0
+            for i, path in enumerate(paths):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.remove(path)
+                write_page(range_first_page + i, data)
+                byte_count += len(data)
+            _record_pages(len(paths), byte_count, time.time() - spawn_time, dpi, 'tiff')
+            page_count += len(paths)
+
+        return page_count
+    finally:
+        shutil.rmtree(output_folder)
+
+
+def _get_fileno(sink):
+    if isinstance(sink, int):
+        return sink
+    try:
+        return sink.fileno()
+    except (AttributeError, IOError, OSError, ValueError):
+        # In memory file objects like BytesIO have a fileno method that raises
+        return None
+
+
+def _page_range(pdf_path, first_page, last_page, userpw, poppler_path, process_group):
+    page_count = _page_count(pdf_path, userpw, poppler_path=poppler_path, process_group=process_group)
+
+    first_page = 1 if first_page is None else max(1, first_page)
+
+    if last_page is None or last_page > page_count:
+        last_page = page_count
+
+    return first_page, last_page, page_count
+
+
+def _guess_archive_format(dest):
+    name = str(getattr(dest, 'name', '') if hasattr(dest, 'write') else dest).lower()
+    for ext, archive_format in (('.tar.gz', 'tar.gz'), ('.tgz', 'tar.gz'), ('.tar.bz2', 'tar.bz2'), ('.tar', 'tar')):
+        if name.endswith(ext):
+            return archive_format
+    return 'zip'
+
+
+def _build_command(args, output_folder, first_page, last_page, fmt, output_file, userpw, use_cropbox, transparent, single_file, grayscale, mono=False, ownerpw=None):
     if use_cropbox:
         args.append('-cropbox')
 
@@ -198,14 +847,197 @@ def _build_command(args, output_folder, first_page, last_page, fmt, output_file,
 
     if userpw is not None:
         args.extend(['-upw', userpw])
-    
+
+    if ownerpw is not None:
+        args.extend(['-opw', ownerpw])
+
     if grayscale:
         args.append('-gray')
 
+    if mono:
+        args.append('-mono')
+
     return args
 
 
-def _parse_format(fmt):
+def _render_single_pages(pdf_path, pages, dpi, fmt, userpw, use_cropbox, transparent, grayscale, use_pdfcairo,
+                         thread_count, poppler_path, process_group, stdout=PIPE, crop_boxes=None, mono=False,
+                         ownerpw=None):
+    """
+        Render every page with its own process writing to stdout, keeping at most
+        thread_count processes running and yielding (page, data, err) in page order,
+        crop_boxes optionally gives the (x, y, width, height) area in pixels to render for every page
+    """
+
+    if use_pdfcairo:
+        command = [_get_command_path('pdftocairo', poppler_path)]
+    else:
+        command = [_get_command_path('pdftoppm', poppler_path)]
+
+    def finish(page_number, spawn_time, proc):
+        data, err = proc.communicate()
+        if data is None:
+            _check_exited(page_number, page_number, proc.returncode, err)
+        _record_pages(1, len(data) if data is not None else None, time.time() - spawn_time, dpi, fmt)
+        return page_number, data, err
+
+    processes = deque()
+    for i, page in enumerate(pages):
+        if len(processes) == thread_count:
+            yield finish(*processes.popleft())
+        args = _build_command(
+            ['-r', str(dpi), pdf_path],
+            None,
+            page,
+            page,
+            fmt,
+            None,
+            userpw,
+            use_cropbox,
+            transparent,
+            True,
+            grayscale,
+            mono,
+            ownerpw,
+        )
+        if crop_boxes is not None:
+            x, y, width, height = crop_boxes[i]
+            args.extend(['-x', str(x), '-y', str(y), '-W', str(width), '-H', str(height)])
+        if use_pdfcairo:
+            # '-' is the output file and makes pdftocairo write the page to stdout,
+            # pdftoppm does so whenever no output file is given
+            args.append('-')
+        processes.append((page, time.time(), process_group.spawn(command + args, stdout=stdout)))
+
+    while processes:
+        yield finish(*processes.popleft())
+
+
+class _ProcessGroup(object):
+    """
+        Spawns the poppler processes of a conversion, kills all of them once the timeout
+        expires and makes sure none is left running or unreaped
+    """
+
+    def __init__(self, env, timeout=None, preexec_fn=None):
+        self.env = env
+        self.preexec_fn = preexec_fn
+        self.timed_out = False
+        self._processes = []
+        self._stopped = []
+        self._lock = threading.Lock()
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self.kill)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def spawn(self, args, stdout=PIPE):
+        with self._lock:
+            if self.timed_out:
+                raise PDFPopplerTimeoutError('Poppler timed out')
+            proc = Popen(args, env=self.env, stdout=stdout, stderr=PIPE, preexec_fn=self.preexec_fn)
+            self._processes.append(proc)
+        _record_spawn(args)
+        return proc
+
+    def check(self, images=None):
+        """
+            Raises if the processes were killed because of the timeout or resource limits,
+            images are the pages that were rendered before that
+        """
+
+        if self.timed_out:
+            raise PDFPopplerTimeoutError('Poppler timed out', images)
+        if self.preexec_fn is not None:
+            for proc in self._processes:
+                if proc.returncode is not None and proc.returncode < 0 and proc not in self._stopped:
+                    raise PDFPopplerResourceError(
+                        'Poppler was killed by signal %d, it probably exceeded its resource limits' % -proc.returncode,
+                        images
+                    )
+
+    def kill(self):
+        with self._lock:
+            self.timed_out = True
+            self._kill_running()
+
+    def stop(self, proc):
+        """
+            Kills proc once its output is no longer needed, check() does not report it
+        """
+
+        with self._lock:
+            self._stopped.append(proc)
+            if proc.poll() is None:
+                try:
+                    proc.kill()
+                except OSError:
+                    pass
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        with self._lock:
+            self._kill_running()
+        for proc in self._processes:
+            if not proc.stderr.closed:
+                # Drains and closes the pipes before reaping the process
+                proc.communicate()
+
+    def _kill_running(self):
+        for proc in self._processes:
+            if proc.poll() is None:
+                try:
+                    proc.kill()
+                except OSError:
+                    pass
+
+
+class _PostProcessor(object):
+    """
+        Runs a function on every page in a process pool as soon as the page is rendered,
+        keeping the results in page order
+    """
+
+    def __init__(self, postprocess, processes=None):
+        # Imported here as multiprocessing is slow to import
+        from multiprocessing import Pool
+
+        self.postprocess = postprocess
+        self.pool = Pool(processes)
+        self.pending = []
+
+    def submit(self, images):
+        for image in images:
+            self.pending.append(self.pool.apply_async(self.postprocess, (image,)))
+
+    def results(self):
+        return [result.get() for result in self.pending]
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def _get_resource_limiter(max_memory, max_cpu_time):
+    if max_memory is None and max_cpu_time is None:
+        return None
+
+    # Only available on POSIX systems
+    import resource
+
+    def limit_resources():
+        if max_memory is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        if max_cpu_time is not None:
+            cpu_time = int(math.ceil(max_cpu_time))
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time))
+
+    return limit_resources
+
+
+def _parse_format(fmt, grayscale=False, mono=False):
     fmt = fmt.lower()
     if fmt[0] == '.':
         fmt = fmt[1:]
@@ -215,37 +1047,71 @@ def _parse_format(fmt):
         return 'png', 'png', parse_buffer_to_png, False
     if fmt in ('tif', 'tiff'):
         return 'tiff', 'tif', None, True
-    # Unable to parse the format so we'll use the default
+    # Unable to parse the format so we'll use the default, poppler writes PBM/PGM files for monochrome/grayscale
+    if mono:
+        return 'ppm', 'pbm', parse_buffer_to_ppm, False
+    if grayscale:
+        return 'ppm', 'pgm', parse_buffer_to_ppm, False
     return 'ppm', 'ppm', parse_buffer_to_ppm, False
 
 
-def _get_command_path(command, poppler_path=None):
-    if platform.system() == 'Windows':
-        command = command + '.exe'
+def _decrypt(pdf_path, userpw=None, ownerpw=None):
+    # Decrypted in a memory backed folder when there is one, the copy never reaches the disk
+    temp_dir = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+    fh, decrypted_path = tempfile.mkstemp(suffix='.pdf', dir=temp_dir)
+    os.close(fh)
 
-    if poppler_path is not None:
-        command = os.path.join(poppler_path, command)
+    command = ['qpdf', '--decrypt']
+    password = ownerpw if ownerpw is not None else userpw
+    if password is not None:
+        command.append('--password=' + password)
+    command.extend([pdf_path, decrypted_path])
 
-    return command
+    try:
+        proc = Popen(command, stdout=PIPE, stderr=PIPE)
+        _record_spawn(command)
+        _, err = proc.communicate()
+    except OSError:
+        # qpdf is optional, without it the passwords are given to every poppler process
+        os.remove(decrypted_path)
+        return None
+
+    # qpdf exits with 3 when it succeeded with warnings
+    if proc.returncode not in (0, 3):
+        os.remove(decrypted_path)
+        raise PDFPageCountError('Unable to decrypt document. %s' % err.decode("utf8", "ignore"))
+
+    return decrypted_path
+
+
+def _get_command_path(command, poppler_path=None):
+    return get_poppler_installation(poppler_path).command_path(command)
 
 
-def _page_count(pdf_path, userpw=None, poppler_path=None):
+def _page_count(pdf_path, userpw=None, poppler_path=None, process_group=None, ownerpw=None):
     try:
         command = [_get_command_path("pdfinfo", poppler_path), pdf_path]
 
         if userpw is not None:
             command.extend(['-upw', userpw])
 
-        # Add poppler path to LD_LIBRARY_PATH
-        env = os.environ.copy()
-        if poppler_path is not None:
-            env["LD_LIBRARY_PATH"] = poppler_path + ":" + env.get("LD_LIBRARY_PATH", "")
-        proc = Popen(command, env=env, stdout=PIPE, stderr=PIPE)
+        if ownerpw is not None:
+            command.extend(['-opw', ownerpw])
+
+        get_registry().inc('pdf2image_pdfinfo_calls_total')
+        if process_group is None:
+            proc = Popen(command, env=get_poppler_installation(poppler_path).env, stdout=PIPE, stderr=PIPE)
+            _record_spawn(command)
+        else:
+            proc = process_group.spawn(command)
 
         out, err = proc.communicate()
     except:
         raise PDFInfoNotInstalledError('Unable to get page count. Is poppler installed and in PATH?')
 
+    if process_group is not None:
+        process_group.check()
+
     try:
         # This will throw if we are unable to get page count
         return int(re.search(r'Pages:\s+(\d+)', out.decode("utf8", "ignore")).group(1))
@@ -253,10 +1119,324 @@ def _page_count(pdf_path, userpw=None, poppler_path=None):
         raise PDFPageCountError('Unable to get page count. %s' % err.decode("utf8", "ignore"))
 
 
+def pdfinfo_from_path(pdf_path, userpw=None, poppler_path=None, last_page=None, ownerpw=None):
+    """
+        Description: Get the document information and the size of every page using pdfinfo
+        Parameters:
+            pdf_path -> Path to the PDF
+            userpw -> PDF's password
+            poppler_path -> Path to look for poppler binaries
+            last_page -> Only get the size of the pages up to this one
+            ownerpw -> PDF's owner password
+        Returns a dictionary of the pdfinfo fields ('Pages' is an integer) in which 'page_info'
+        is the list of the PageInfo of every page
+    """
+
+    return _pdfinfo(pdf_path, userpw, poppler_path, last_page=last_page, ownerpw=ownerpw)
+
+
+def _pdfinfo(pdf_path, userpw=None, poppler_path=None, process_group=None, last_page=None, ownerpw=None):
+    # pdfinfo lists the pages when given a range, a last page after the end of the document is
+    # replaced by the page count
+    command = [
+        _get_command_path('pdfinfo', poppler_path),
+        '-box',
+        '-f', '1',
+        '-l', str(last_page if last_page is not None and last_page > 0 else 2 ** 31 - 1),
+        pdf_path,
+    ]
+
+    if userpw is not None:
+        command.extend(['-upw', userpw])
+
+    if ownerpw is not None:
+        command.extend(['-opw', ownerpw])
+
+    try:
+        get_registry().inc('pdf2image_pdfinfo_calls_total')
+        if process_group is None:
+            proc = Popen(command, env=get_poppler_installation(poppler_path).env, stdout=PIPE, stderr=PIPE)
+            _record_spawn(command)
+        else:
+            proc = process_group.spawn(command)
+
+        out, err = proc.communicate()
+    except:
+        raise PDFInfoNotInstalledError('Unable to get page count. Is poppler installed and in PATH?')
+
+    if process_group is not None:
+        process_group.check()
+
+    out = out.decode("utf8", "ignore")
+
+    info = {}
+    for line in out.splitlines():
+        # Per page lines look like "Page    1 MediaBox:     0.00     0.00   612.00   792.00"
+        if ':' in line and not re.match(r'Page\s+\d+ ', line):
+            key, value = line.split(':', 1)
+            info[key.strip()] = value.strip()
+
+    try:
+        # This will throw if we are unable to get page count
+        info['Pages'] = int(info['Pages'])
+    except:
+        raise PDFPageCountError('Unable to get page count. %s' % err.decode("utf8", "ignore"))
+
+    box = r'Page\s+(\d+) %s:\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)'
+    media_boxes = re.findall(box % 'MediaBox', out)
+    crop_boxes = dict((page, (x1, y1, x2, y2)) for page, x1, y1, x2, y2 in re.findall(box % 'CropBox', out))
+    rotations = dict(re.findall(r'Page\s+(\d+) rot:\s+(\d+)', out))
+
+    info['page_info'] = []
+    for page, x1, y1, x2, y2 in media_boxes:
+        crop_x1, crop_y1, crop_x2, crop_y2 = crop_boxes.get(page, (x1, y1, x2, y2))
+        info['page_info'].append(PageInfo(
+            int(page),
+            float(x2) - float(x1),
+            float(y2) - float(y1),
+            float(crop_x2) - float(crop_x1),
+            float(crop_y2) - float(crop_y1),
+            int(rotations.get(page, 0)),
+        ))
+
+    return info
+
+
+def _pixel_size(page_info, dpi, use_cropbox=False):
+    if use_cropbox:
+        width, height = page_info.crop_width, page_info.crop_height
+    else:
+        width, height = page_info.width, page_info.height
+    # Same rounding as poppler
+    return int(math.ceil(width * dpi / 72.)), int(math.ceil(height * dpi / 72.))
+
+
+def _ppm_size(pixel_size, grayscale=False, mono=False):
+    width, height = pixel_size
+    if mono:
+        # PBM has no maxval and packs 8 pixels per byte
+        return len('P4\n%d %d\n' % (width, height)) + (width + 7) // 8 * height
+    header = '%s\n%d %d\n255\n' % ('P5' if grayscale else 'P6', width, height)
+    return len(header) + width * height * (1 if grayscale else 3)
+
+
+def _split_pages(first_page, last_page, thread_count, page_costs=None):
+    page_count = last_page - first_page + 1
+    ranges = []
+
+    if page_costs is None:
+        # Same number of pages for every thread
+        reminder = page_count % thread_count
+        current_page = first_page
+        for _ in range(thread_count):
+            thread_page_count = page_count // thread_count + int(reminder > 0)
+            ranges.append((current_page, current_page + thread_page_count - 1))
+            current_page += thread_page_count
+            reminder -= int(reminder > 0)
+        return ranges
+
+    # Contiguous ranges of roughly the same cost, every thread gets at least one page
+    remaining_cost = float(sum(page_costs[page] for page in range(first_page, last_page + 1)))
+    current_page = first_page
+    for i in range(thread_count):
+        remaining_threads = thread_count - i
+        if remaining_threads == 1:
+            ranges.append((current_page, last_page))
+            break
+        target_cost = remaining_cost / remaining_threads
+        range_last_page = current_page
+        cost = page_costs[current_page]
+        # A page is added when that brings the range closer to the target
+        while range_last_page < last_page - (remaining_threads - 1) and \
+                cost + page_costs[range_last_page + 1] / 2. <= target_cost:
+            range_last_page += 1
+            cost += page_costs[range_last_page]
+        ranges.append((current_page, range_last_page))
+        remaining_cost -= cost
+        current_page = range_last_page + 1
+
+    return ranges
+
+
+class _PageStreamReader(object):
+    """
+        Reads the PPM pages a process writes to stdout on a thread, counting the complete ones, and stops
+        the process as soon as it output page_limit pages
+    """
+
+    def __init__(self, proc, process_group):
+        self.proc = proc
+        self.process_group = process_group
+        self.page_limit = None
+        self._data = bytearray()
+        self._page_ends = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._read)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def limit(self, page_limit):
+        with self._lock:
+            self.page_limit = page_limit
+            self._check_limit()
+
+    def join(self):
+        """
+            Waits for the end of the process, returns the bytes of the pages up to page_limit
+        """
+
+        self._thread.join()
+        self.proc.stdout.close()
+        self.proc.stderr.close()
+        self.proc.wait()
+        page_count = len(self._page_ends) if self.page_limit is None else min(self.page_limit, len(self._page_ends))
+        return bytes(self._data[:self._page_ends[page_count - 1]]) if page_count else b''
+
+    def _read(self):
+        fd = self.proc.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            with self._lock:
+                self._data += chunk
+                end = self._page_ends[-1] if self._page_ends else 0
+                while True:
+                    file_size = ppm_file_size(self._data, end)
+                    if file_size is None or end + file_size > len(self._data):
+                        break
+                    end += file_size
+                    self._page_ends.append(end)
+                self._check_limit()
+
+    def _check_limit(self):
+        if self.page_limit is not None and len(self._page_ends) >= self.page_limit:
+            self.process_group.stop(self.proc)
+
+
+def _stream_pages(proc, file_size_func, end_marker, err):
+    """
+        Yields the files a process writes one after the other to stdout as soon as each one is complete,
+        its stderr is appended to err once it exits
+    """
+
+    # stderr is drained on the side so that poppler never blocks on it
+    err_thread = threading.Thread(target=lambda: err.append(proc.stderr.read()))
+    err_thread.daemon = True
+    err_thread.start()
+
+    data = bytearray()
+    fd = proc.stdout.fileno()
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        data += chunk
+        # Looking for the end of a file is only worth it once the bytes that end it were received
+        if end_marker is not None and end_marker not in data[-(len(chunk) + len(end_marker) + 8):]:
+            continue
+        while data:
+            file_size = file_size_func(data)
+            if file_size is None or file_size > len(data):
+                break
+            yield bytes(data[:file_size])
+            del data[:file_size]
+
+    proc.stdout.close()
+    err_thread.join()
+    proc.stderr.close()
+    proc.wait()
+
+
+def _communicate(proc, size_hint=None):
+    """
+        Same as proc.communicate() but stdout is read into a buffer allocated with the expected
+        size instead of joining the chunks once the process is done
+    """
+
+    if not size_hint:
+        return proc.communicate()
+
+    # stderr is drained on the side so that poppler never blocks on it
+    err = []
+    err_thread = threading.Thread(target=lambda: err.append(proc.stderr.read()))
+    err_thread.daemon = True
+    err_thread.start()
+
+    data = bytearray(size_hint)
+    size = 0
+    while True:
+        if size == len(data):
+            # The estimate was exact or too small, a byte is read to know which before growing the buffer
+            byte = proc.stdout.read(1)
+            if not byte:
+                break
+            data.extend(bytearray(max(len(data) // 2, 65536)))
+            data[size:size + 1] = byte
+            size += 1
+        view = memoryview(data)[size:]
+        read = proc.stdout.readinto(view)
+        del view
+        if not read:
+            break
+        size += read
+    del data[size:]
+
+    proc.stdout.close()
+    err_thread.join()
+    proc.stderr.close()
+    proc.wait()
+
+    return data, err[0]
+
+
+def _page_images(pdf_path, first_page=None, last_page=None, userpw=None, poppler_path=None):
+    args = ['-list', pdf_path]
+    if first_page is not None:
+        args.extend(['-f', str(first_page)])
+    if last_page is not None:
+        args.extend(['-l', str(last_page)])
+    if userpw is not None:
+        args.extend(['-upw', userpw])
+
+    out, _ = _run_info_command('pdfimages', args, poppler_path)
+
+    return _parse_image_list(out)
+
+
+def _parse_image_list(out):
+    # Columns are: page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio,
+    # the first two lines are the header of the table
+    images = {}
+    for line in out.splitlines()[2:]:
+        columns = line.split()
+        if len(columns) == 16:
+            images.setdefault(int(columns[0]), []).append(columns)
+    return images
+
+
+def _run_info_command(command, args, poppler_path=None):
+    installation = get_poppler_installation(poppler_path)
+    try:
+        proc = Popen([installation.command_path(command)] + args, env=installation.env, stdout=PIPE, stderr=PIPE)
+        _record_spawn([command])
+        out, err = proc.communicate()
+    except OSError:
+        raise PDFInfoNotInstalledError('Unable to run %s. Is poppler installed and in PATH?' % command)
+
+    return out.decode("utf8", "ignore"), err.decode("utf8", "ignore")
+
+
 def _load_from_output_folder(output_folder, output_file, ext, in_memory=False):
+    from PIL import Image
+
+    # Only the files of this output_file, either "<output_file>-<page>.<ext>" or "<output_file>.<ext>"
+    # with -singlefile, so that conversions sharing the output folder never pick each other's files
+    output_file_pattern = re.compile(re.escape(output_file) + r'(-\d+)?\.' + re.escape(ext) + '$')
+
     images = []
     for f in sorted(os.listdir(output_folder)):
-        if f.startswith(output_file) and f.split('.')[-1] == ext:
+        if output_file_pattern.match(f):
             images.append(Image.open(os.path.join(output_folder, f)))
             if in_memory:
                 images[-1].load()
@@ -0,0 +1,140 @@
+"""
+    Tiled rendering of large pages, the page is rendered by pieces so that memory
+    usage only depends on the tile size and not on the page size
+"""
+
+import mmap
+
+from io import BytesIO
+
+from .pdf2image import (
+    _ProcessGroup,
+    _pdfinfo,
+    _pixel_size,
+    _render_single_pages
+)
+
+from .exceptions import PDFPageCountError, PDFRenderError, PDFSyntaxError
+from .installation import get_poppler_installation
+from .parsers import ppm_file_size
+
+
+def iter_tiles(pdf_path, page, dpi=200, tile_size=2048, thread_count=1, userpw=None, use_cropbox=False,
+               strict=False, poppler_path=None, grayscale=False, timeout=None):
+    """
+        Description: Render a page tile by tile
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            page -> Page to render
+            dpi -> Image quality in DPI (default 200)
+            tile_size -> Width and height of the tiles in pixels
+            thread_count -> How many tiles are rendered at the same time
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+        Yields (x, y, image) for every tile, row by row, x and y being its position in the page
+    """
+
+    from PIL import Image
+
+    width, height = _page_pixel_size(pdf_path, page, dpi, userpw, use_cropbox, poppler_path)
+
+    for x, y, data in _iter_tile_data(pdf_path, page, width, height, dpi, tile_size, thread_count, userpw,
+                                      use_cropbox, strict, poppler_path, grayscale, timeout):
+        yield x, y, Image.open(BytesIO(data))
+
+
+def convert_page_tiled(pdf_path, page, output_path, dpi=200, tile_size=2048, thread_count=1, userpw=None,
+                       use_cropbox=False, strict=False, poppler_path=None, grayscale=False, timeout=None):
+    """
+        Description: Render a page tile by tile into a memory mapped PPM (PGM when grayscale) file
+        Parameters:
+            pdf_path -> Path to the PDF that you want to convert
+            page -> Page to render
+            output_path -> Path of the PPM file to create
+            dpi -> Image quality in DPI (default 200)
+            tile_size -> Width and height of the tiles in pixels
+            thread_count -> How many tiles are rendered at the same time
+            userpw -> PDF's password
+            use_cropbox -> Use cropbox instead of mediabox
+            strict -> When a Syntax Error is thrown, it will be raised as an Exception
+            poppler_path -> Path to look for poppler binaries
+            grayscale -> Output grayscale image(s)
+            timeout -> Seconds after which every poppler process is killed and PDFPopplerTimeoutError is raised
+        Returns the image, opened lazily from output_path
+    """
+
+    from PIL import Image
+
+    width, height = _page_pixel_size(pdf_path, page, dpi, userpw, use_cropbox, poppler_path)
+    pixel_bytes = 1 if grayscale else 3
+    header = ('%s\n%d %d\n255\n' % ('P5' if grayscale else 'P6', width, height)).encode('ascii')
+
+    with open(output_path, 'w+b') as f:
+        f.write(header)
+        f.truncate(len(header) + width * height * pixel_bytes)
+        f.flush()
+        output = mmap.mmap(f.fileno(), 0)
+        try:
+            for x, y, data in _iter_tile_data(pdf_path, page, width, height, dpi, tile_size, thread_count, userpw,
+                                              use_cropbox, strict, poppler_path, grayscale, timeout):
+                tile_width, tile_height, offset = _parse_ppm_header(data)
+                # Poppler's rounding can differ from ours by a pixel on the last row or column
+                row_bytes = min(tile_width, width - x) * pixel_bytes
+                data = memoryview(data)
+                for row in range(min(tile_height, height - y)):
+                    start = offset + row * tile_width * pixel_bytes
+                    output_start = len(header) + ((y + row) * width + x) * pixel_bytes
+                    output[output_start:output_start + row_bytes] = data[start:start + row_bytes]
+            output.flush()
+        finally:
+            output.close()
+
+    return Image.open(output_path)
+
+
+def _iter_tile_data(pdf_path, page, width, height, dpi, tile_size, thread_count, userpw, use_cropbox, strict,
+                    poppler_path, grayscale, timeout):
+    crop_boxes = [
+        (x, y, min(tile_size, width - x), min(tile_size, height - y))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+    process_group = _ProcessGroup(get_poppler_installation(poppler_path).env, timeout)
+    try:
+        tiles = _render_single_pages(pdf_path, [page] * len(crop_boxes), dpi, 'ppm', userpw, use_cropbox, False,
+                                     grayscale, False, max(1, thread_count), poppler_path, process_group,
+                                     crop_boxes=crop_boxes)
+        for (x, y, _, _), (_, data, err) in zip(crop_boxes, tiles):
+            process_group.check()
+            if b'Syntax Error' in err and strict:
+                raise PDFSyntaxError(err.decode("utf8", "ignore"))
+            # A process that crashed output nothing or a truncated tile
+            file_size = ppm_file_size(data)
+            if file_size is None or file_size > len(data):
+                raise PDFRenderError('Poppler did not output the tile at (%d, %d) of page %d. %s'
+                                     % (x, y, page, err.decode("utf8", "ignore").strip()))
+            yield x, y, data
+    finally:
+        process_group.close()
+
+
+def _page_pixel_size(pdf_path, page, dpi, userpw, use_cropbox, poppler_path):
+    for page_info in _pdfinfo(pdf_path, userpw, poppler_path, last_page=page)['page_info']:
+        if page_info.page == page:
+            width, height = _pixel_size(page_info, dpi, use_cropbox)
+            # Poppler renders rotated pages rotated
+            if page_info.rotation in (90, 270):
+                width, height = height, width
+            return width, height
+    raise PDFPageCountError('Page %d does not exist' % page)
+
+
+def _parse_ppm_header(data):
+    code, size, maxval = data[:40].split(b'\n')[0:3]
+    width, height = size.split(b' ')
+    return int(width), int(height), len(code) + len(size) + len(maxval) + 3
@@ -51,5 +51,11 @@ setup(
     packages=find_packages(exclude=['contrib', 'docs', 'tests']),
     install_requires=[
         'pillow',
-    ]
+    ],
+
+    entry_points={
+        'console_scripts': [
+            'pdf2image=pdf2image.cli:main',
+        ],
+    },
 )
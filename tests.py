@@ -24,11 +24,15 @@ from memory_profiler import profile as profile_memory
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from pdf2image import convert_from_bytes, convert_from_path
+from pdf2image import convert_from_bytes, convert_from_path, convert_to_archive, convert_to_sink, pdfinfo_from_path
 from pdf2image.exceptions import (
     PDFInfoNotInstalledError,
     PDFPageCountError,
-    PDFSyntaxError
+    PDFSyntaxError,
+    PDFPopplerTimeoutError,
+    PDFPopplerResourceError,
+    PDFPixelLimitError,
+    PDFRenderError
 )
 
 from functools import wraps
@@ -42,6 +46,21 @@ except OSError as e:
     if e.errno == os.errno.ENOENT:
         POPPLER_INSTALLED = False
 
+try:
+    subprocess.call(["qpdf", "--version"], stdout=open(os.devnull, 'w'), stderr=open(os.devnull, 'w'))
+    QPDF_INSTALLED = True
+except OSError:
+    QPDF_INSTALLED = False
+
+try:
+    import gi
+    gi.require_version('Poppler', '0.18')
+    from gi.repository import Poppler
+    import cairo
+    POPPLER_BINDINGS_INSTALLED = True
+except (ImportError, ValueError):
+    POPPLER_BINDINGS_INSTALLED = False
+
 def profile(f):
     if PROFILE_MEMORY:
         @wraps(f)
@@ -57,6 +76,63 @@ def profile(f):
             return r
         return wrapped
 
+def thumbnail_size(image):
+    # Used as postprocess, it has to be a module level function to be sent to the process pool
+    image.thumbnail((64, 64))
+    return image.size
+
+def write_fake_pdfinfo(path, page_count, page_size=None):
+    # page_size gives every page a (width, height) media box in points
+    with open(os.path.join(path, 'pdfinfo'), 'w') as f:
+        f.write('#!{}\nprint("Pages:          {}")\n'.format(sys.executable, page_count))
+        if page_size is not None:
+            for page in range(1, page_count + 1):
+                f.write('print("Page    {} MediaBox:     0.00     0.00   {:.2f}   {:.2f}")\n'.format(page, *page_size))
+    os.chmod(os.path.join(path, 'pdfinfo'), 0o755)
+
+def write_fake_pdftoppm(path, page_count, name='pdftoppm', fmt='ppm', progress=True, crash_on=(),
+                        crash_in_ranges_on=()):
+    # Fake renderer for a document of page_count pages, its arguments are logged in "runs". It outputs 2x1 PGM
+    # pages whose pixels are the page number to stdout, or TIFF files when fmt is 'tiff' as poppler can not
+    # write those to a pipe. It exits on the pages of crash_on, and on those of crash_in_ranges_on when it
+    # renders more than one page
+    with open(os.path.join(path, name), 'w') as f:
+        f.write('#!{}\n'.format(sys.executable))
+        f.write('import os, sys, time\n')
+        f.write('if "-h" in sys.argv:\n')
+        if progress:
+            f.write('    sys.stderr.write("  -progress                : print progress info\\n")\n')
+        f.write('    sys.exit(99)\n')
+        f.write('with open("{}", "a") as f:\n'.format(os.path.join(path, 'runs')))
+        f.write('    f.write(" ".join(sys.argv[1:]) + "\\n")\n')
+        # Like poppler, page 0 is the first page
+        f.write('first = max(1, int(sys.argv[sys.argv.index("-f") + 1]))\n')
+        f.write('last = min({0}, int(sys.argv[sys.argv.index("-l") + 1]) if "-l" in sys.argv else {0})\n'.format(page_count))
+        f.write('if first > last:\n')
+        f.write('    sys.stderr.write("Wrong page range given\\n")\n')
+        f.write('    sys.exit(99)\n')
+        f.write('for page in range(first, last + 1):\n')
+        f.write('    if page in {!r} or (page in {!r} and first != last):\n'.format(tuple(crash_on), tuple(crash_in_ranges_on)))
+        f.write('        sys.stderr.write("crash on page %d" % page)\n')
+        f.write('        sys.exit(1)\n')
+        f.write('    time.sleep(0.05)\n')
+        if fmt == 'tiff':
+            f.write('    from PIL import Image\n')
+            f.write('    root = [arg for arg in sys.argv[sys.argv.index("-tiff") + 1:] if arg != "-singlefile"][0]\n')
+            f.write('    Image.new("L", (2, 1), page).save(root + ".tif" if "-singlefile" in sys.argv else "%s-%d.tif" % (root, page))\n')
+        else:
+            f.write('    os.write(1, b"P5\\n2 1\\n255\\n" + bytes(bytearray([page, page])))\n')
+        f.write('    if "-progress" in sys.argv:\n')
+        f.write('        os.write(2, ("%d %d \\n" % (page, last)).encode())\n')
+    os.chmod(os.path.join(path, name), 0o755)
+
+def read_runs(path):
+    # Arguments of every run of the fake binaries, the file is removed so that the next runs start afresh
+    with open(os.path.join(path, 'runs')) as f:
+        runs = [line.split() for line in f]
+    os.remove(os.path.join(path, 'runs'))
+    return runs
+
 class PDFConversionMethods(unittest.TestCase):
     @profile
     @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
@@ -433,6 +509,39 @@ class PDFConversionMethods(unittest.TestCase):
                 [im.close() for im in images_from_bytes]
         print('test_locked_pdf_with_ownerpw_and_userpw: {} sec'.format(time.time() - start_time))
 
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_locked_pdf_with_ownerpw(self):
+        start_time = time.time()
+        images_from_path = convert_from_path('./tests/test_locked_user_only.pdf', ownerpw='pdf2image', thread_count=2)
+        self.assertTrue(len(images_from_path) == 1)
+        print('test_locked_pdf_with_ownerpw: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_locked_pdf_with_userpw_using_decrypt(self):
+        start_time = time.time()
+        with open('./tests/test_locked_user_only.pdf', 'rb') as pdf_file:
+            # Without qpdf the password is given to poppler as usual
+            images_from_bytes = convert_from_bytes(pdf_file.read(), userpw='pdf2image', decrypt=True)
+            self.assertTrue(len(images_from_bytes) == 1)
+        print('test_locked_pdf_with_userpw_using_decrypt: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not QPDF_INSTALLED, "qpdf is not installed!")
+    def test_decrypt_locked_pdf(self):
+        start_time = time.time()
+        from pdf2image.pdf2image import _decrypt
+        decrypted_path = _decrypt('./tests/test_locked_user_only.pdf', userpw='pdf2image')
+        try:
+            with open(decrypted_path, 'rb') as f:
+                self.assertTrue(b'/Encrypt' not in f.read())
+        finally:
+            os.remove(decrypted_path)
+        with self.assertRaises(PDFPageCountError):
+            _decrypt('./tests/test_locked_user_only.pdf', userpw='wrong')
+        print('test_decrypt_locked_pdf: {} sec'.format(time.time() - start_time))
+
     ## Tests cropbox
 
     @profile
@@ -645,6 +754,80 @@ class PDFConversionMethods(unittest.TestCase):
         [im.close() for im in images_from_path]
         print('test_conversion_from_path_using_transparent_without_png: {} sec'.format(time.time() - start_time))
 
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_14_using_transparent_with_4_threads(self):
+        start_time = time.time()
+        images_from_path = convert_from_path('./tests/test_14.pdf', transparent=True, fmt='png', thread_count=4)
+        self.assertTrue(len(images_from_path) == 14)
+        self.assertTrue(all(im.mode == 'RGBA' for im in images_from_path))
+        print('test_conversion_from_path_14_using_transparent_with_4_threads: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    def test_png_parser_with_iend_in_chunk_data(self):
+        start_time = time.time()
+        from io import BytesIO
+        from PIL import Image, PngImagePlugin
+        from pdf2image.parsers import parse_buffer_to_png
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Comment', 'IEND.....PNG')
+        data = b''
+        for size in [(10, 20), (30, 40), (50, 60)]:
+            buf = BytesIO()
+            Image.new('RGBA', size).save(buf, format='PNG', pnginfo=info)
+            data += buf.getvalue()
+        images = parse_buffer_to_png(data)
+        self.assertTrue([im.size for im in images] == [(10, 20), (30, 40), (50, 60)])
+        print('test_png_parser_with_iend_in_chunk_data: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_ppm_parser_with_pgm_and_pbm(self):
+        start_time = time.time()
+        from io import BytesIO
+        from PIL import Image
+        from pdf2image.parsers import parse_buffer_to_ppm
+        for mode in ['RGB', 'L', '1']:
+            data = b''
+            for size in [(10, 20), (33, 40), (50, 61)]:
+                buf = BytesIO()
+                Image.new(mode, size).save(buf, format='PPM')
+                data += buf.getvalue()
+            images = parse_buffer_to_ppm(data)
+            self.assertTrue([im.size for im in images] == [(10, 20), (33, 40), (50, 61)])
+            self.assertTrue(all(im.mode == mode for im in images))
+        print('test_ppm_parser_with_pgm_and_pbm: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_bytes_14_using_grayscale(self):
+        start_time = time.time()
+        with open('./tests/test_14.pdf', 'rb') as pdf_file:
+            images_from_bytes = convert_from_bytes(pdf_file.read(), grayscale=True, thread_count=4)
+        self.assertTrue(len(images_from_bytes) == 14)
+        self.assertTrue(all(im.mode == 'L' for im in images_from_bytes))
+        print('test_conversion_from_bytes_14_using_grayscale: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_14_using_mono(self):
+        start_time = time.time()
+        images_from_path = convert_from_path('./tests/test_14.pdf', mono=True, thread_count=4)
+        self.assertTrue(len(images_from_path) == 14)
+        self.assertTrue(all(im.mode == '1' for im in images_from_path))
+        print('test_conversion_from_path_14_using_mono: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_14_using_grayscale_with_dir(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            images_from_path = convert_from_path('./tests/test_14.pdf', output_folder=path, grayscale=True)
+            self.assertTrue(len(images_from_path) == 14)
+            self.assertTrue(all(im.mode == 'L' for im in images_from_path))
+            self.assertTrue(all(name.endswith('.pgm') for name in os.listdir(path)))
+            [im.close() for im in images_from_path]
+        print('test_conversion_from_path_14_using_grayscale_with_dir: {} sec'.format((time.time() - start_time) / 14.))
+
     ## Test output as TIFF
 
     @profile
@@ -666,6 +849,1040 @@ class PDFConversionMethods(unittest.TestCase):
             [im.close() for im in images_from_path]
         print('test_conversion_to_tiff_from_path_using_dir_14: {} sec'.format((time.time() - start_time) / 14.))
 
+    ## Test archive output
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_zip_14_with_4_threads(self):
+        start_time = time.time()
+        import zipfile
+        with TemporaryDirectory() as path:
+            archive_path = os.path.join(path, 'pages.zip')
+            page_count = convert_to_archive('./tests/test_14.pdf', archive_path, thread_count=4)
+            self.assertTrue(page_count == 14)
+            with zipfile.ZipFile(archive_path) as archive:
+                names = archive.namelist()
+                self.assertTrue(names == ['page-{:02d}.png'.format(i) for i in range(1, 15)])
+                self.assertTrue(archive.read(names[0]).startswith(b'\x89PNG'))
+        print('test_conversion_to_zip_14_with_4_threads: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_tar_file_object_first_page_2_last_page_3(self):
+        start_time = time.time()
+        import tarfile
+        from io import BytesIO
+        buffer = BytesIO()
+        page_count = convert_to_archive('./tests/test_14.pdf', buffer, first_page=2, last_page=3, fmt='jpeg', archive_format='tar')
+        self.assertTrue(page_count == 2)
+        buffer.seek(0)
+        with tarfile.open(fileobj=buffer) as archive:
+            self.assertTrue(archive.getnames() == ['page-02.jpg', 'page-03.jpg'])
+        print('test_conversion_to_tar_file_object_first_page_2_last_page_3: {} sec'.format((time.time() - start_time) / 2.))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_archive_names_padded_to_page_count(self):
+        start_time = time.time()
+        import zipfile
+        from io import BytesIO
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 14)
+            write_fake_pdftoppm(path, 14)
+            buffer = BytesIO()
+            convert_to_archive('./tests/test.pdf', buffer, fmt='ppm', last_page=3, poppler_path=path)
+            with zipfile.ZipFile(buffer) as archive:
+                self.assertTrue(archive.namelist() == ['page-01.ppm', 'page-02.ppm', 'page-03.ppm'])
+        print('test_archive_names_padded_to_page_count: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_backend_names_padded_to_page_count(self):
+        start_time = time.time()
+        from pdf2image.backends import available_backends
+        for backend in set(available_backends()) - set(['pdftoppm', 'pdftocairo']):
+            with TemporaryDirectory() as path:
+                convert_from_path('./tests/test_14.pdf', dpi=20, output_folder=path, last_page=3,
+                                  output_file='page', fmt='png', backend=backend)
+                self.assertTrue(sorted(os.listdir(path)) == ['page-01.png', 'page-02.png', 'page-03.png'])
+        print('test_backend_names_padded_to_page_count: {} sec'.format(time.time() - start_time))
+
+    ## Test concurrent conversions in a shared folder
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_concurrent_conversions_using_shared_dir(self):
+        start_time = time.time()
+        from multiprocessing.pool import ThreadPool
+        with TemporaryDirectory() as path:
+            def convert(i):
+                images = convert_from_path('./tests/test_14.pdf', output_folder=path, thread_count=1 + i % 12)
+                filenames = [im.filename for im in images]
+                [im.close() for im in images]
+                return filenames
+            pool = ThreadPool(16)
+            results = pool.map(convert, range(48))
+            pool.close()
+            pool.join()
+            self.assertTrue(all(len(filenames) == 14 for filenames in results))
+            self.assertTrue(len(set(f for filenames in results for f in filenames)) == 48 * 14)
+        print('test_concurrent_conversions_using_shared_dir: {} sec'.format((time.time() - start_time) / (48 * 14.)))
+
+    @profile
+    def test_load_from_output_folder_ignores_other_output_files(self):
+        start_time = time.time()
+        from PIL import Image
+        from pdf2image.pdf2image import _load_from_output_folder
+        with TemporaryDirectory() as path:
+            for f in ['out_1-01.ppm', 'out_1-02.ppm', 'out_10-01.ppm', 'out_1_extra-01.ppm', 'out_1-01.jpg', 'out_1.ppm']:
+                Image.new('RGB', (1, 1)).save(os.path.join(path, f), format='PPM' if f.endswith('ppm') else 'JPEG')
+            images = _load_from_output_folder(path, 'out_1', 'ppm')
+            filenames = [os.path.basename(im.filename) for im in images]
+            [im.close() for im in images]
+        self.assertTrue(filenames == ['out_1-01.ppm', 'out_1-02.ppm', 'out_1.ppm'])
+        print('test_load_from_output_folder_ignores_other_output_files: {} sec'.format(time.time() - start_time))
+
+    ## Test import time
+
+    @profile
+    def test_import_time_without_pillow(self):
+        start_time = time.time()
+        script = (
+            'import sys, time\n'
+            'start_time = time.time()\n'
+            'import pdf2image\n'
+            'print(time.time() - start_time)\n'
+            'print("PIL" in sys.modules)\n'
+        )
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)))
+        import_time, pil_imported = output.decode('utf8').split()
+        self.assertTrue(pil_imported == 'False')
+        print('test_import_time_without_pillow: {} sec (import: {} sec)'.format(time.time() - start_time, import_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_archive_without_pillow(self):
+        start_time = time.time()
+        script = (
+            'import sys, io\n'
+            'from pdf2image import convert_to_archive\n'
+            'convert_to_archive("./tests/test.pdf", io.BytesIO())\n'
+            'print("PIL" in sys.modules)\n'
+        )
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertTrue(output.decode('utf8').strip() == 'False')
+        print('test_conversion_to_archive_without_pillow: {} sec'.format(time.time() - start_time))
+
+    ## Test page information
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_pdfinfo_from_path_14(self):
+        start_time = time.time()
+        info = pdfinfo_from_path('./tests/test_14.pdf')
+        self.assertTrue(info['Pages'] == 14)
+        self.assertTrue([page_info.page for page_info in info['page_info']] == list(range(1, 15)))
+        images_from_path = convert_from_path('./tests/test_14.pdf', dpi=72, last_page=2)
+        for image, page_info in zip(images_from_path, info['page_info']):
+            self.assertTrue(abs(image.size[0] - page_info.width) <= 1 and abs(image.size[1] - page_info.height) <= 1)
+        print('test_pdfinfo_from_path_14: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_14_over_max_pixels(self):
+        start_time = time.time()
+        try:
+            convert_from_path('./tests/test_14.pdf', dpi=600, max_pixels=10 ** 6)
+            raise Exception("This should not happen")
+        except PDFPixelLimitError:
+            pass
+        images_from_path = convert_from_path('./tests/test_14.pdf', dpi=72, max_pixels=10 ** 8, thread_count=4)
+        self.assertTrue(len(images_from_path) == 14)
+        print('test_conversion_from_path_14_over_max_pixels: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_split_pages_by_cost(self):
+        start_time = time.time()
+        from pdf2image.pdf2image import _split_pages
+        self.assertTrue(_split_pages(1, 14, 4) == [(1, 4), (5, 8), (9, 11), (12, 14)])
+        self.assertTrue(_split_pages(1, 5, 3, {1: 100, 2: 1, 3: 1, 4: 1, 5: 1}) == [(1, 1), (2, 3), (4, 5)])
+        self.assertTrue(_split_pages(1, 6, 2, {1: 1, 2: 1, 3: 1, 4: 1, 5: 10, 6: 10}) == [(1, 5), (6, 6)])
+        self.assertTrue(_split_pages(3, 6, 4, {3: 1, 4: 1, 5: 1, 6: 1}) == [(3, 3), (4, 4), (5, 5), (6, 6)])
+        print('test_split_pages_by_cost: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_communicate_with_size_hint(self):
+        start_time = time.time()
+        from pdf2image.pdf2image import _communicate
+        script = 'import sys, os; os.write(1, b"x" * 100000); os.write(2, b"e" * 200000)'
+        for size_hint in [10, 100000, 1000000]:
+            proc = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            data, err = _communicate(proc, size_hint)
+            self.assertTrue(len(data) == 100000 and len(err) == 200000 and proc.returncode == 0)
+        print('test_communicate_with_size_hint: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_communicate_with_exact_size_hint(self):
+        start_time = time.time()
+        from pdf2image.pdf2image import _communicate
+        script = 'import sys, os; os.write(1, b"x" * 1000000)'
+        for size_hint in [1000000, 999999]:
+            proc = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            data, _ = _communicate(proc, size_hint)
+            self.assertTrue(data == b"x" * 1000000)
+            if size_hint == len(data):
+                # The buffer was not grown to find the end of the output
+                self.assertTrue(sys.getsizeof(data) < size_hint + 1024)
+        print('test_communicate_with_exact_size_hint: {} sec'.format(time.time() - start_time))
+
+    ## Test partial conversion
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_partial_conversion_retries_missing_pages(self):
+        start_time = time.time()
+        from pdf2image.partial import convert_partial
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 5)
+            # Crashes on page 3 when it renders a range, page 5 never renders
+            write_fake_pdftoppm(path, 5, crash_on=[5], crash_in_ranges_on=[3])
+            results = convert_partial('./tests/test.pdf', poppler_path=path, retries=2)
+        self.assertTrue([result.page for result in results] == [1, 2, 3, 4, 5])
+        self.assertTrue([result.image.getpixel((0, 0)) for result in results[:4]] == [1, 2, 3, 4])
+        self.assertTrue([result.attempts for result in results] == [1, 1, 2, 2, 3])
+        self.assertTrue(all(result.error is None for result in results[:4]))
+        self.assertTrue(results[4].image is None and isinstance(results[4].error, PDFRenderError))
+        self.assertTrue('crash on page 5' in str(results[4].error))
+        print('test_partial_conversion_retries_missing_pages: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_conversion_raises_on_missing_pages(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 5)
+            # Crashes on page 3, without -progress the page count comes from pdfinfo
+            write_fake_pdftoppm(path, 5, progress=False, crash_on=[3])
+            for thread_count in [1, 2]:
+                with self.assertRaises(PDFRenderError) as context:
+                    convert_from_path('./tests/test.pdf', poppler_path=path, thread_count=thread_count)
+                self.assertTrue('crash on page 3' in str(context.exception))
+            # The ranges that do not include page 3 are complete
+            self.assertTrue(len(convert_from_path('./tests/test.pdf', poppler_path=path, first_page=4)) == 2)
+        print('test_conversion_raises_on_missing_pages: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_conversion_from_page_0(self):
+        start_time = time.time()
+        from pdf2image.partial import convert_partial
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 3)
+            # pdftoppm renders page 0 as page 1, with and without the single pass conversion
+            for progress in [True, False]:
+                write_fake_pdftoppm(path, 3, progress=progress)
+                for thread_count in [1, 2]:
+                    images = convert_from_path('./tests/test.pdf', first_page=0, thread_count=thread_count,
+                                               poppler_path=path)
+                    self.assertTrue([im.getpixel((0, 0)) for im in images] == [1, 2, 3])
+            results = convert_partial('./tests/test.pdf', first_page=0, thread_count=2, poppler_path=path)
+            self.assertTrue([result.page for result in results] == [1, 2, 3])
+        print('test_conversion_from_page_0: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_partial_conversion_to_tiff(self):
+        start_time = time.time()
+        from pdf2image.partial import convert_partial
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 3)
+            write_fake_pdftoppm(path, 3, name='pdftocairo', fmt='tiff', crash_on=[2])
+            results = convert_partial('./tests/test.pdf', fmt='tiff', thread_count=2, poppler_path=path)
+            self.assertTrue([result.image.getpixel((0, 0)) for result in (results[0], results[2])] == [1, 3])
+            self.assertTrue(results[1].image is None and isinstance(results[1].error, PDFRenderError))
+            self.assertTrue('crash on page 2' in str(results[1].error))
+            self.assertTrue([result.attempts for result in results] == [1, 2, 1])
+        print('test_partial_conversion_to_tiff: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_partial_conversion_spawns_no_empty_range(self):
+        start_time = time.time()
+        from pdf2image.partial import convert_partial
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 3)
+            write_fake_pdftoppm(path, 3)
+            results = convert_partial('./tests/test.pdf', poppler_path=path, thread_count=8)
+            self.assertTrue([result.image.getpixel((0, 0)) for result in results] == [1, 2, 3])
+            runs = read_runs(path)
+            self.assertTrue(sorted(run[run.index('-f') + 1] + '-' + run[run.index('-l') + 1] for run in runs) ==
+                            ['1-1', '2-2', '3-3'])
+            self.assertTrue(convert_partial('./tests/test.pdf', poppler_path=path, first_page=5) == [])
+            self.assertFalse(os.path.exists(os.path.join(path, 'runs')))
+        print('test_partial_conversion_spawns_no_empty_range: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_partial_conversion_14_with_4_threads(self):
+        start_time = time.time()
+        from pdf2image.partial import convert_partial
+        results = convert_partial('./tests/test_14.pdf', thread_count=4)
+        self.assertTrue([result.page for result in results] == list(range(1, 15)))
+        self.assertTrue(all(result.image is not None and result.error is None for result in results))
+        print('test_partial_conversion_14_with_4_threads: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_partial_conversion_with_strict(self):
+        start_time = time.time()
+        from pdf2image.partial import convert_partial
+        results = convert_partial('./tests/test_strict.pdf', strict=True)
+        self.assertTrue(all(isinstance(result.error, PDFSyntaxError) for result in results if result.image is None))
+        print('test_partial_conversion_with_strict: {} sec'.format(time.time() - start_time))
+
+    ## Test page records
+
+    @profile
+    def test_page_list_releases_buffers(self):
+        start_time = time.time()
+        from io import BytesIO
+        from PIL import Image
+        from pdf2image.pages import Page, PageList
+        pages = []
+        for i, mode in enumerate(['RGB', 'L', '1']):
+            buf = BytesIO()
+            Image.new(mode, (30 + i, 40)).save(buf, format='PPM')
+            pages.append(Page(i + 1, buf.getvalue(), 100, 'test.pdf', 'ppm'))
+        with PageList(pages) as page_list:
+            self.assertTrue([(page.page, page.mode, page.size) for page in page_list] == [
+                (1, 'RGB', (30, 40)), (2, 'L', (31, 40)), (3, '1', (32, 40))
+            ])
+            self.assertTrue(page_list[1].to_image().getpixel((0, 0)) == 0)
+            self.assertFalse(hasattr(page_list[0], '__dict__'))
+        self.assertTrue(all(page.data is None for page in pages))
+        with self.assertRaises(ValueError):
+            pages[0].to_image()
+        print('test_page_list_releases_buffers: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_pages_14_with_4_threads(self):
+        start_time = time.time()
+        from pdf2image.pages import convert_to_pages
+        with convert_to_pages('./tests/test_14.pdf', dpi=100, fmt='png', thread_count=4) as pages:
+            self.assertTrue([page.page for page in pages] == list(range(1, 15)))
+            self.assertTrue(all(page.dpi == 100 and page.fmt == 'png' for page in pages))
+            self.assertTrue(pages[0].to_image().size == pages[0].size)
+        self.assertTrue(all(page.data is None for page in pages))
+        print('test_conversion_to_pages_14_with_4_threads: {} sec'.format((time.time() - start_time) / 14.))
+
+    ## Test post-processing
+
+    @profile
+    def test_postprocessor_keeps_page_order(self):
+        start_time = time.time()
+        from PIL import Image
+        from pdf2image.pdf2image import _PostProcessor
+        images = [Image.new('RGB', (1000 - 50 * i, 100 + 50 * i)) for i in range(10)] + [Image.new('L', (640, 640))]
+        postprocessor = _PostProcessor(thumbnail_size, 4)
+        try:
+            postprocessor.submit(images[:10])
+            postprocessor.submit(images[10:])
+            sizes = postprocessor.results()
+        finally:
+            postprocessor.close()
+        self.assertTrue(sizes == [thumbnail_size(im) for im in images])
+        print('test_postprocessor_keeps_page_order: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "A Python script is used as a fake qpdf")
+    def test_decrypted_copy_removed_when_postprocess_fails(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            # Copies the document and logs where the decrypted copy is
+            with open(os.path.join(path, 'qpdf'), 'w') as f:
+                f.write('#!{}\n'.format(sys.executable))
+                f.write('import shutil, sys\n')
+                f.write('shutil.copyfile(sys.argv[-2], sys.argv[-1])\n')
+                f.write('open("{}", "w").write(sys.argv[-1])\n'.format(os.path.join(path, 'decrypted')))
+            os.chmod(os.path.join(path, 'qpdf'), 0o755)
+            environ_path = os.environ['PATH']
+            os.environ['PATH'] = path + os.pathsep + environ_path
+            try:
+                # The pool can not be started without processes
+                with self.assertRaises(ValueError):
+                    convert_from_path('./tests/test.pdf', decrypt=True, postprocess=thumbnail_size,
+                                      postprocess_workers=0)
+            finally:
+                os.environ['PATH'] = environ_path
+            with open(os.path.join(path, 'decrypted')) as f:
+                self.assertFalse(os.path.exists(f.read()))
+        print('test_decrypted_copy_removed_when_postprocess_fails: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_14_with_postprocess(self):
+        start_time = time.time()
+        sizes = convert_from_path('./tests/test_14.pdf', thread_count=4, postprocess=thumbnail_size)
+        expected_sizes = [thumbnail_size(im) for im in convert_from_path('./tests/test_14.pdf')]
+        self.assertTrue(sizes == expected_sizes and len(sizes) == 14)
+        print('test_conversion_from_path_14_with_postprocess: {} sec'.format((time.time() - start_time) / 14.))
+
+    ## Test metrics
+
+    @profile
+    def test_metrics_exposition(self):
+        start_time = time.time()
+        from pdf2image.metrics import NullRegistry, Registry, expose, get_registry, set_registry
+        self.assertTrue(isinstance(get_registry(), NullRegistry))
+        registry = Registry(buckets=(0.1, 1.0))
+        previous = set_registry(registry)
+        try:
+            registry.inc('pdf2image_pages_rendered_total', 2, dpi='200', fmt='ppm')
+            registry.inc('pdf2image_pages_rendered_total', dpi='200', fmt='ppm')
+            registry.observe('pdf2image_page_render_seconds', 0.5, dpi='200', fmt='ppm')
+            registry.observe('pdf2image_page_render_seconds', 2, dpi='200', fmt='ppm')
+            self.assertTrue(registry.value('pdf2image_pages_rendered_total', fmt='ppm', dpi='200') == 3)
+            self.assertTrue(expose().splitlines() == [
+                '# HELP pdf2image_pages_rendered_total Pages rendered',
+                '# TYPE pdf2image_pages_rendered_total counter',
+                'pdf2image_pages_rendered_total{dpi="200",fmt="ppm"} 3',
+                '# HELP pdf2image_page_render_seconds Rendering time of a page',
+                '# TYPE pdf2image_page_render_seconds histogram',
+                'pdf2image_page_render_seconds_bucket{dpi="200",fmt="ppm",le="0.1"} 0',
+                'pdf2image_page_render_seconds_bucket{dpi="200",fmt="ppm",le="1.0"} 1',
+                'pdf2image_page_render_seconds_bucket{dpi="200",fmt="ppm",le="+Inf"} 2',
+                'pdf2image_page_render_seconds_sum{dpi="200",fmt="ppm"} 2.5',
+                'pdf2image_page_render_seconds_count{dpi="200",fmt="ppm"} 2',
+            ])
+        finally:
+            set_registry(previous)
+        print('test_metrics_exposition: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_metrics_conversion_from_path_14_with_4_threads(self):
+        start_time = time.time()
+        from pdf2image.metrics import Registry, set_registry
+        registry = Registry()
+        previous = set_registry(registry)
+        try:
+            images = convert_from_path('./tests/test_14.pdf', thread_count=4)
+        finally:
+            set_registry(previous)
+        self.assertTrue(registry.value('pdf2image_pages_rendered_total', dpi='200', fmt='ppm') == 14)
+        self.assertTrue(registry.value('pdf2image_page_render_seconds', dpi='200', fmt='ppm') == 14)
+        # The PPM headers are counted as well
+        self.assertTrue(registry.value('pdf2image_bytes_produced_total', dpi='200', fmt='ppm') >
+                        sum(3 * im.size[0] * im.size[1] for im in images))
+        # pdfinfo is not needed when pdftoppm reports the page count itself
+        from pdf2image.installation import get_poppler_installation
+        self.assertTrue(registry.value('pdf2image_pdfinfo_calls_total') ==
+                        (0 if get_poppler_installation().supports('pdftoppm', '-progress') else 1))
+        self.assertTrue(registry.value('pdf2image_process_spawns_total', command='pdftoppm') == 4)
+        self.assertTrue(registry.value('pdf2image_conversions_total', dpi='200', fmt='ppm') == 1)
+        print('test_metrics_conversion_from_path_14_with_4_threads: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    def test_metrics_in_process_backends(self):
+        start_time = time.time()
+        from pdf2image.backends import available_backends, clear_document_cache
+        from pdf2image.metrics import Registry, set_registry
+        for backend in set(available_backends()) & set(['poppler-glib', 'pypdfium2']):
+            clear_document_cache()
+            registry = Registry()
+            previous = set_registry(registry)
+            try:
+                convert_from_path('./tests/test_14.pdf', dpi=72, fmt='png', backend=backend)
+            finally:
+                set_registry(previous)
+            self.assertTrue(registry.value('pdf2image_pages_rendered_total', dpi='72', fmt='png') == 14)
+            # The document opened to get the page count is reused by every page
+            self.assertTrue(registry.value('pdf2image_cache_misses_total', cache='document') == 1)
+            self.assertTrue(registry.value('pdf2image_cache_hits_total', cache='document') == 14)
+        print('test_metrics_in_process_backends: {} sec'.format(time.time() - start_time))
+
+    ## Test poppler installation detection
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Shell scripts are used as fake poppler binaries")
+    def test_poppler_installation_is_detected_once(self):
+        start_time = time.time()
+        from pdf2image.installation import get_poppler_installation
+        with TemporaryDirectory() as path:
+            with open(os.path.join(path, 'pdftoppm'), 'w') as f:
+                f.write('#!/bin/sh\n')
+                f.write('echo run >> "{}"\n'.format(os.path.join(path, 'runs')))
+                f.write('echo "pdftoppm version 21.03.0" >&2\n')
+                f.write('echo "  -gray                    : generate a grayscale PGM file" >&2\n')
+                f.write('echo "  -progress                : print progress info" >&2\n')
+                f.write('exit 99\n')
+            os.chmod(os.path.join(path, 'pdftoppm'), 0o755)
+            installation = get_poppler_installation(path)
+            self.assertTrue(installation is get_poppler_installation(path))
+            self.assertTrue(installation.command_path('pdftoppm') == os.path.join(path, 'pdftoppm'))
+            self.assertTrue(installation.env['LD_LIBRARY_PATH'].startswith(path + ':'))
+            self.assertTrue(installation.version == (21, 3, 0))
+            self.assertTrue(installation.supports('pdftoppm', '-progress'))
+            self.assertTrue(installation.supports('pdftoppm', '-gray'))
+            self.assertFalse(installation.supports('pdftoppm', '-mono'))
+            self.assertFalse(installation.is_installed('pdftocairo'))
+            with open(os.path.join(path, 'runs')) as f:
+                self.assertTrue(len(f.readlines()) == 1)
+        print('test_poppler_installation_is_detected_once: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_single_pass_conversion_without_pdfinfo(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            # There is no pdfinfo so the page count can only come from -progress
+            write_fake_pdftoppm(path, 14)
+            images = convert_from_path('./tests/test.pdf', poppler_path=path, thread_count=4)
+            self.assertTrue([im.getpixel((0, 0)) for im in images] == list(range(1, 15)))
+            runs = read_runs(path)
+            # The first process is stopped at the end of its share of the pages
+            self.assertTrue(len(runs) == 4 and '-progress' in runs[0] and '-l' not in runs[0])
+            self.assertTrue(all('-progress' not in run for run in runs[1:]))
+            self.assertTrue(convert_from_path('./tests/test.pdf', poppler_path=path, first_page=15) == [])
+        print('test_single_pass_conversion_without_pdfinfo: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_single_pass_conversion_spawns_no_empty_range(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            write_fake_pdftoppm(path, 3)
+            images = convert_from_path('./tests/test.pdf', poppler_path=path, thread_count=4)
+            self.assertTrue([im.getpixel((0, 0)) for im in images] == [1, 2, 3])
+            # Only two pages are left once the first one is rendered, they are shared by two processes
+            runs = read_runs(path)
+            self.assertTrue(len(runs) == 2 and runs[1][runs[1].index('-f'):runs[1].index('-l') + 2] == ['-f', '3', '-l', '3'])
+            images = convert_from_path('./tests/test.pdf', poppler_path=path, first_page=2, thread_count=2)
+            self.assertTrue([im.getpixel((0, 0)) for im in images] == [2, 3])
+            self.assertTrue(len(read_runs(path)) == 1)
+        print('test_single_pass_conversion_spawns_no_empty_range: {} sec'.format(time.time() - start_time))
+
+    ## Test rendering backends
+
+    @profile
+    @unittest.skipIf(not POPPLER_BINDINGS_INSTALLED, "Poppler bindings are not installed!")
+    def test_conversion_from_path_14_using_poppler_glib_with_4_threads(self):
+        start_time = time.time()
+        images_from_path = convert_from_path('./tests/test_14.pdf', thread_count=4, backend='poppler-glib')
+        self.assertTrue(len(images_from_path) == 14)
+        # The second conversion reuses the parsed documents
+        second_start_time = time.time()
+        images_from_path = convert_from_path('./tests/test_14.pdf', first_page=3, last_page=4, backend='poppler-glib')
+        self.assertTrue([im.mode for im in images_from_path] == ['RGB', 'RGB'])
+        print('test_conversion_from_path_14_using_poppler_glib_with_4_threads: {} sec, then {} sec'.format(
+            (second_start_time - start_time) / 14., (time.time() - second_start_time) / 2.
+        ))
+
+    @profile
+    @unittest.skipIf(not POPPLER_BINDINGS_INSTALLED, "Poppler bindings are not installed!")
+    def test_conversion_from_path_using_poppler_glib_with_dir_and_grayscale(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            images_from_path = convert_from_path('./tests/test_14.pdf', output_folder=path, last_page=3,
+                                                 output_file='page', fmt='png', grayscale=True,
+                                                 backend='poppler-glib')
+            self.assertTrue(all(im.mode == 'L' for im in images_from_path))
+            self.assertTrue(sorted(os.listdir(path)) == ['page-01.png', 'page-02.png', 'page-03.png'])
+        print('test_conversion_from_path_using_poppler_glib_with_dir_and_grayscale: {} sec'.format(
+            time.time() - start_time
+        ))
+
+    @profile
+    def test_conversion_with_unknown_backend(self):
+        start_time = time.time()
+        with self.assertRaises(ValueError):
+            convert_from_path('./tests/test.pdf', backend='ghostscript')
+        print('test_conversion_with_unknown_backend: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_conversion_to_tiff_using_pdftoppm_in_memory(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 2)
+            write_fake_pdftoppm(path, 2, fmt='tiff', progress=False)
+            images = convert_from_path('./tests/test.pdf', fmt='tiff', backend='pdftoppm', poppler_path=path)
+            self.assertTrue([im.getpixel((0, 0)) for im in images] == [1, 2])
+        print('test_conversion_to_tiff_using_pdftoppm_in_memory: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_backend_throughput(self):
+        start_time = time.time()
+        from pdf2image.backends import available_backends, clear_document_cache
+        for backend in available_backends():
+            fmt = 'png' if backend == 'pdftocairo' else 'ppm'
+            for pdf_path in ['./tests/test.pdf', './tests/test_14.pdf']:
+                clear_document_cache()
+                backend_start_time = time.time()
+                images = convert_from_path(pdf_path, fmt=fmt, thread_count=4, backend=backend)
+                elapsed = time.time() - backend_start_time
+                self.assertTrue(len(images) == (14 if pdf_path.endswith('_14.pdf') else 1))
+                print('test_backend_throughput: {} on {}: {:.2f} pages/sec'.format(
+                    backend, pdf_path, len(images) / elapsed if elapsed > 0 else 0.
+                ))
+        print('test_backend_throughput: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_backend_document_cache_skips_bytes(self):
+        start_time = time.time()
+        from pdf2image.backends import _document_cache, available_backends, clear_document_cache
+        with open('./tests/test_14.pdf', 'rb') as pdf_file:
+            data = pdf_file.read()
+        for backend in set(available_backends()) - set(['pdftoppm', 'pdftocairo']):
+            clear_document_cache()
+            images = convert_from_bytes(data, dpi=20, last_page=2, thread_count=2, backend=backend)
+            self.assertTrue(len(images) == 2)
+            # The temporary file is gone, its documents are not kept
+            self.assertTrue(len(_document_cache.idle) == 0)
+        print('test_backend_document_cache_skips_bytes: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "A Python script is used as a fake qpdf")
+    def test_backend_document_cache_skips_decrypted_copy(self):
+        start_time = time.time()
+        from pdf2image.backends import _document_cache, available_backends, clear_document_cache
+        with TemporaryDirectory() as path:
+            with open(os.path.join(path, 'qpdf'), 'w') as f:
+                f.write('#!{}\nimport shutil, sys\nshutil.copyfile(sys.argv[-2], sys.argv[-1])\n'.format(sys.executable))
+            os.chmod(os.path.join(path, 'qpdf'), 0o755)
+            environ_path = os.environ['PATH']
+            os.environ['PATH'] = path + os.pathsep + environ_path
+            try:
+                for backend in set(available_backends()) - set(['pdftoppm', 'pdftocairo']):
+                    clear_document_cache()
+                    images = convert_from_path('./tests/test_14.pdf', dpi=20, last_page=2, backend=backend,
+                                               decrypt=True)
+                    self.assertTrue(len(images) == 2)
+                    # The decrypted copy is removed, its documents are not kept
+                    self.assertTrue(len(_document_cache.idle) == 0)
+            finally:
+                os.environ['PATH'] = environ_path
+        print('test_backend_document_cache_skips_decrypted_copy: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_backend_document_cache(self):
+        start_time = time.time()
+        from pdf2image.backends import _DocumentCache
+        opened = []
+        class Backend(object):
+            name = 'test'
+            def open(self, pdf_path, userpw):
+                opened.append(pdf_path)
+                return object()
+        backend = Backend()
+        cache = _DocumentCache(2)
+        key, first = cache.acquire(backend, './tests/test.pdf', None)
+        # A document in use is never handed to another caller
+        _, second = cache.acquire(backend, './tests/test.pdf', None)
+        self.assertTrue(first is not second and len(opened) == 2)
+        cache.release(key, first)
+        cache.release(key, second)
+        _, reused = cache.acquire(backend, './tests/test.pdf', None)
+        self.assertTrue(reused in (first, second) and len(opened) == 2)
+        # The least recently used documents are closed first
+        other_key, other = cache.acquire(backend, './tests/test_14.pdf', None)
+        cache.release(other_key, other)
+        self.assertTrue(len(cache.idle[key]) == 1 and cache.idle[other_key] == [other])
+        cache.release(key, reused)
+        self.assertTrue(list(cache.idle) == [key] and len(cache.idle[key]) == 2)
+        print('test_backend_document_cache: {} sec'.format(time.time() - start_time))
+
+    ## Test tiled rendering
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_tiled_conversion_matches_full_page(self):
+        start_time = time.time()
+        from PIL import ImageChops, ImageStat
+        from pdf2image.tiling import convert_page_tiled, iter_tiles
+        full_page = convert_from_path('./tests/test.pdf', dpi=150)[0]
+        tiles = list(iter_tiles('./tests/test.pdf', 1, dpi=150, tile_size=500, thread_count=4))
+        self.assertTrue(sum(tile.size[0] * tile.size[1] for _, _, tile in tiles) == full_page.size[0] * full_page.size[1])
+        with TemporaryDirectory() as path:
+            tiled_page = convert_page_tiled('./tests/test.pdf', 1, os.path.join(path, 'page.ppm'), dpi=150, tile_size=500, thread_count=4)
+            self.assertTrue(tiled_page.size == full_page.size)
+            difference = ImageStat.Stat(ImageChops.difference(tiled_page.convert('RGB'), full_page.convert('RGB')))
+            tiled_page.close()
+        self.assertTrue(max(difference.mean) < 1)
+        print('test_tiled_conversion_matches_full_page: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_tiled_conversion_raises_on_crash(self):
+        start_time = time.time()
+        from pdf2image.tiling import convert_page_tiled, iter_tiles
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 1, page_size=(72, 72))
+            write_fake_pdftoppm(path, 1, crash_on=[1])
+            with self.assertRaises(PDFRenderError) as context:
+                list(iter_tiles('./tests/test.pdf', 1, dpi=20, tile_size=10, poppler_path=path))
+            self.assertTrue('crash on page 1' in str(context.exception))
+            with self.assertRaises(PDFRenderError):
+                convert_page_tiled('./tests/test.pdf', 1, os.path.join(path, 'page.ppm'), dpi=20, tile_size=10,
+                                   poppler_path=path)
+        print('test_tiled_conversion_raises_on_crash: {} sec'.format(time.time() - start_time))
+
+    ## Test timeout and resource limits
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_241_with_timeout(self):
+        start_time = time.time()
+        try:
+            convert_from_path('./tests/test_241.pdf', dpi=300, thread_count=4, timeout=1)
+            raise Exception("This should not happen")
+        except PDFPopplerTimeoutError as ex:
+            self.assertTrue(len(ex.images) < 241)
+        self.assertTrue(time.time() - start_time < 10)
+        print('test_conversion_from_path_241_with_timeout: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    @unittest.skipIf(not os.name == 'posix', "This test only works on posix systems")
+    def test_conversion_from_path_241_with_cpu_time_limit(self):
+        start_time = time.time()
+        try:
+            convert_from_path('./tests/test_241.pdf', dpi=300, output_folder=None, max_cpu_time=1)
+            raise Exception("This should not happen")
+        except PDFPopplerResourceError as ex:
+            self.assertTrue(len(ex.images) == 0)
+        print('test_conversion_from_path_241_with_cpu_time_limit: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_with_timeout_not_reached(self):
+        start_time = time.time()
+        images_from_path = convert_from_path('./tests/test_14.pdf', thread_count=4, timeout=60, max_memory=2 ** 31)
+        self.assertTrue(len(images_from_path) == 14)
+        print('test_conversion_from_path_with_timeout_not_reached: {} sec'.format(time.time() - start_time))
+
+    ## Test sinks
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_callback_sink_14_with_4_threads(self):
+        start_time = time.time()
+        pages = []
+        page_count = convert_to_sink('./tests/test_14.pdf', lambda page, data: pages.append((page, data)), fmt='jpeg', thread_count=4)
+        self.assertTrue(page_count == 14)
+        self.assertTrue([page for page, _ in pages] == list(range(1, 15)))
+        self.assertTrue(all(data.startswith(b'\xff\xd8') for _, data in pages))
+        print('test_conversion_to_callback_sink_14_with_4_threads: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_file_sink_14(self):
+        start_time = time.time()
+        from pdf2image.parsers import parse_buffer_to_ppm
+        with TemporaryDirectory() as path:
+            with open(os.path.join(path, 'pages.ppm'), 'wb') as f:
+                page_count = convert_to_sink('./tests/test_14.pdf', f)
+            with open(os.path.join(path, 'pages.ppm'), 'rb') as f:
+                self.assertTrue(len(parse_buffer_to_ppm(f.read())) == page_count == 14)
+        print('test_conversion_to_file_sink_14: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_to_pipe_sink_using_transparent(self):
+        start_time = time.time()
+        from pdf2image.parsers import parse_buffer_to_png
+        read_fd, write_fd = os.pipe()
+        try:
+            # The pipe is big enough for the page of test.pdf
+            page_count = convert_to_sink('./tests/test.pdf', write_fd, dpi=20, fmt='png', transparent=True)
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            images = parse_buffer_to_png(f.read())
+        self.assertTrue(page_count == len(images) == 1 and images[0].mode == 'RGBA')
+        print('test_conversion_to_pipe_sink_using_transparent: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_conversion_to_callback_sink_renders_ranges(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 14)
+            write_fake_pdftoppm(path, 14)
+            pages = []
+            page_count = convert_to_sink('./tests/test.pdf', lambda page, data: pages.append((page, data)),
+                                         thread_count=4, poppler_path=path)
+            self.assertTrue(page_count == 14)
+            self.assertTrue(pages == [(page, b'P5\n2 1\n255\n' + bytes(bytearray([page, page]))) for page in range(1, 15)])
+            # A process per range of pages, not per page
+            self.assertTrue(len(read_runs(path)) == 4)
+        print('test_conversion_to_callback_sink_renders_ranges: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_conversion_to_file_sink_raises_on_crash(self):
+        start_time = time.time()
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 3)
+            # Poppler writes straight to the file, it crashes before the first page
+            write_fake_pdftoppm(path, 3, crash_on=[1])
+            write_fake_pdftoppm(path, 3, name='pdftocairo', crash_on=[2])
+            with open(os.path.join(path, 'pages'), 'wb') as f:
+                with self.assertRaises(PDFRenderError) as context:
+                    convert_to_sink('./tests/test.pdf', f, poppler_path=path)
+                self.assertTrue('crash on page 1' in str(context.exception))
+                # pdftocairo renders every page with its own process
+                with self.assertRaises(PDFRenderError) as context:
+                    convert_to_sink('./tests/test.pdf', f, fmt='png', transparent=True, poppler_path=path)
+                self.assertTrue('crash on page 2' in str(context.exception))
+        print('test_conversion_to_file_sink_raises_on_crash: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_conversion_to_sink_using_tiff(self):
+        start_time = time.time()
+        from io import BytesIO
+        from PIL import Image
+        with TemporaryDirectory() as path:
+            write_fake_pdfinfo(path, 3)
+            write_fake_pdftoppm(path, 3, name='pdftocairo', fmt='tiff', progress=False)
+            pages = []
+            page_count = convert_to_sink('./tests/test.pdf', lambda page, data: pages.append((page, data)),
+                                         fmt='tiff', thread_count=2, poppler_path=path)
+            self.assertTrue(page_count == 3 and [page for page, _ in pages] == [1, 2, 3])
+            self.assertTrue([Image.open(BytesIO(data)).getpixel((0, 0)) for _, data in pages] == [1, 2, 3])
+            # A file descriptor sink is not given to pdftocairo either
+            with open(os.path.join(path, 'pages.tif'), 'wb') as f:
+                self.assertTrue(convert_to_sink('./tests/test.pdf', f, fmt='tiff', first_page=2, poppler_path=path) == 2)
+            with open(os.path.join(path, 'pages.tif'), 'rb') as f:
+                self.assertTrue(Image.open(f).getpixel((0, 0)) == 2)
+        print('test_conversion_to_sink_using_tiff: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_split_concatenated_pages(self):
+        start_time = time.time()
+        from io import BytesIO
+        from PIL import Image
+        from pdf2image.parsers import jpeg_file_size, png_file_size, ppm_file_size
+        for fmt, file_size_func in [('PPM', ppm_file_size), ('PNG', png_file_size), ('JPEG', jpeg_file_size)]:
+            files = []
+            for i, mode in enumerate(['RGB', 'L']):
+                buf = BytesIO()
+                Image.effect_noise((300 + i, 200), 50).convert(mode).save(buf, format=fmt)
+                files.append(buf.getvalue())
+            data = b''.join(files)
+            self.assertTrue(file_size_func(data) == len(files[0]))
+            self.assertTrue(file_size_func(data, len(files[0])) == len(files[1]))
+            # An incomplete file has no size, or a size larger than the data
+            size = file_size_func(data[:len(files[0]) - 1])
+            self.assertTrue(size is None or size == len(files[0]))
+            self.assertTrue(file_size_func(data[:20]) in (None, len(files[0])))
+        print('test_split_concatenated_pages: {} sec'.format(time.time() - start_time))
+
+    ## Test incremental conversion
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_incremental_conversion_14_reuses_cached_pages(self):
+        start_time = time.time()
+        from pdf2image.incremental import convert_incremental, page_fingerprints
+        fingerprints = page_fingerprints('./tests/test_14.pdf')
+        self.assertTrue([page for page, _ in fingerprints] == list(range(1, 15)))
+        with TemporaryDirectory() as path:
+            images = convert_incremental('./tests/test_14.pdf', path, fmt='jpeg', thread_count=4)
+            self.assertTrue(len(images) == 14)
+            [im.close() for im in images]
+            cached = dict((f, os.path.getmtime(os.path.join(path, f))) for f in os.listdir(path))
+            removed = sorted(cached)[0]
+            os.remove(os.path.join(path, removed))
+            time.sleep(1)
+            images = convert_incremental('./tests/test_14.pdf', path, fmt='jpeg', thread_count=4)
+            self.assertTrue(len(images) == 14)
+            [im.close() for im in images]
+            for f in cached:
+                if f != removed:
+                    self.assertTrue(os.path.getmtime(os.path.join(path, f)) == cached[f])
+            self.assertTrue(os.path.exists(os.path.join(path, removed)))
+        print('test_incremental_conversion_14_reuses_cached_pages: {} sec'.format(time.time() - start_time))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_page_fingerprints_detect_changes_without_text(self):
+        start_time = time.time()
+        from pdf2image.incremental import page_fingerprints
+        from pdf2image.metrics import Registry, set_registry
+        with TemporaryDirectory() as path:
+            # Two pages with the same text and no images, what is drawn and the page size come from files
+            scripts = {
+                'pdftotext': 'sys.stdout.write("text\\f" * 2)\n',
+                'pdfimages': 'sys.stdout.write("header\\n-----\\n")\n',
+                'pdfinfo': 'width = open(os.path.join(path, "width")).read()\n'
+                           'print("Pages:          2")\n'
+                           'for page in (1, 2):\n'
+                           '    print("Page    %d MediaBox:     0.00     0.00   %s   792.00" % (page, width))\n',
+                'pdftoppm': 'if "-h" in sys.argv:\n'
+                            '    sys.exit(99)\n'
+                            'pixel = int(open(os.path.join(path, "pixel")).read())\n'
+                            'for page in (1, 2):\n'
+                            '    os.write(1, b"P5\\n1 1\\n255\\n" + bytes(bytearray([pixel if page == 2 else 0])))\n',
+            }
+            for name, script in scripts.items():
+                with open(os.path.join(path, name), 'w') as f:
+                    f.write('#!{}\nimport os, sys\npath = {!r}\n'.format(sys.executable, path) + script)
+                os.chmod(os.path.join(path, name), 0o755)
+            for name, value in [('width', '612.00'), ('pixel', '0')]:
+                with open(os.path.join(path, name), 'w') as f:
+                    f.write(value)
+            registry = Registry()
+            previous_registry = set_registry(registry)
+            try:
+                fingerprints = page_fingerprints('./tests/test.pdf', poppler_path=path)
+            finally:
+                set_registry(previous_registry)
+            for command in ['pdftotext', 'pdfimages', 'pdfinfo', 'pdftoppm']:
+                self.assertTrue(registry.value('pdf2image_process_spawns_total', command=command) == 1)
+            # A change in the vector graphics of the second page
+            with open(os.path.join(path, 'pixel'), 'w') as f:
+                f.write('255')
+            changed = page_fingerprints('./tests/test.pdf', poppler_path=path)
+            self.assertTrue(changed[0] == fingerprints[0] and changed[1] != fingerprints[1])
+            # A page resize
+            with open(os.path.join(path, 'width'), 'w') as f:
+                f.write('595.00')
+            resized = page_fingerprints('./tests/test.pdf', poppler_path=path)
+            self.assertTrue(resized[0] != changed[0] and resized[1] != changed[1])
+        print('test_page_fingerprints_detect_changes_without_text: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_incremental_contiguous_ranges(self):
+        start_time = time.time()
+        from pdf2image.incremental import _contiguous_ranges
+        self.assertTrue(_contiguous_ranges([1, 2, 3, 5, 7, 8]) == [(1, 3), (5, 5), (7, 8)])
+        self.assertTrue(_contiguous_ranges([]) == [])
+        print('test_incremental_contiguous_ranges: {} sec'.format(time.time() - start_time))
+
+    ## Test adaptive conversion
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_adaptive_conversion_14_with_pixel_budget(self):
+        start_time = time.time()
+        from pdf2image.adaptive import convert_adaptive, plan_pages
+        plan = plan_pages('./tests/test_14.pdf', max_page_pixels=500000)
+        self.assertTrue([page for page, _, _, _ in plan] == list(range(1, 15)))
+        images = convert_adaptive('./tests/test_14.pdf', max_page_pixels=500000, thread_count=2)
+        self.assertTrue(len(images) == 14)
+        for image, (_, _, grayscale, _) in zip(images, plan):
+            self.assertTrue(image.size[0] * image.size[1] <= 500000)
+            self.assertTrue((image.mode == 'L') == grayscale)
+        print('test_adaptive_conversion_14_with_pixel_budget: {} sec'.format((time.time() - start_time) / 14.))
+
+    @profile
+    @unittest.skipIf(os.name == 'nt', "Python scripts are used as fake poppler binaries")
+    def test_adaptive_conversion_runs_pdfinfo_once(self):
+        start_time = time.time()
+        from pdf2image.adaptive import convert_adaptive
+        with TemporaryDirectory() as path:
+            # Pages 2 and 4 have a color image, every run is logged
+            scripts = {
+                'pdfinfo': 'print("Pages:          4")\n'
+                           'for page in range(1, 5):\n'
+                           '    print("Page    %d MediaBox:     0.00     0.00   72.00   72.00" % page)\n',
+                'pdfimages': 'print("header\\n-----")\n'
+                             'for page in (2, 4):\n'
+                             '    print("%d 0 image 10 10 rgb 3 8 jpeg no 10 0 72 72 1K 3%%" % page)\n',
+                'pdftoppm': 'from io import BytesIO\n'
+                            'from PIL import Image\n'
+                            'first, last = int(sys.argv[sys.argv.index("-f") + 1]), int(sys.argv[sys.argv.index("-l") + 1])\n'
+                            'fmt = "PNG" if "-png" in sys.argv else "JPEG" if "-jpeg" in sys.argv else "PPM"\n'
+                            'for page in range(first, last + 1):\n'
+                            '    buf = BytesIO()\n'
+                            '    Image.new("L" if "-gray" in sys.argv else "RGB", (page, 1)).save(buf, format=fmt)\n'
+                            '    os.write(1, buf.getvalue())\n',
+            }
+            for name, script in scripts.items():
+                with open(os.path.join(path, name), 'w') as f:
+                    f.write('#!{}\nimport os, sys\n'.format(sys.executable))
+                    f.write('open({!r}, "a").write(" ".join([{!r}] + sys.argv[1:]) + "\\n")\n'.format(
+                        os.path.join(path, 'runs'), name))
+                    f.write(script)
+                os.chmod(os.path.join(path, name), 0o755)
+            images = convert_adaptive('./tests/test.pdf', poppler_path=path, thread_count=2)
+            self.assertTrue([(im.size[0], im.mode, im.format) for im in images] == [
+                (1, 'L', 'PNG'), (2, 'RGB', 'JPEG'), (3, 'L', 'PNG'), (4, 'RGB', 'JPEG')
+            ])
+            runs = read_runs(path)
+            self.assertTrue(sorted(run[0] for run in runs) == ['pdfimages', 'pdfinfo'] + ['pdftoppm'] * 4)
+        print('test_adaptive_conversion_runs_pdfinfo_once: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_parse_image_list(self):
+        start_time = time.time()
+        from pdf2image.pdf2image import _parse_image_list
+        out = (
+            'page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio\n'
+            '--------------------------------------------------------------------------------------------\n'
+            '   1     0 image    2480  3508  gray    1   8  jpeg   no        10  0   300   300  377K  4.4%\n'
+            '   3     1 image     640   480  rgb     3   8  image  no        25  0    72    72 12.5K  1.4%\n'
+            '   3     2 smask     640   480  gray    1   8  image  no        25  0    72    72  100B  0.0%\n'
+        )
+        images = _parse_image_list(out)
+        self.assertTrue(sorted(images) == [1, 3])
+        self.assertTrue([columns[5] for columns in images[3]] == ['rgb', 'gray'])
+        print('test_parse_image_list: {} sec'.format(time.time() - start_time))
+
+    ## Test command line
+
+    @profile
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_cli_conversion_with_glob_and_resume(self):
+        start_time = time.time()
+        from pdf2image.cli import main, DONE_MARKER
+        with TemporaryDirectory() as path:
+            self.assertTrue(main(['./tests/test_1*.pdf', '-o', path, '--jobs', '4', '--threads', '2', '--fmt', 'jpeg']) == 0)
+            files = sorted(os.listdir(os.path.join(path, 'test_14')))
+            self.assertTrue(len(files) == 15 and DONE_MARKER in files)
+            os.remove(os.path.join(path, 'test_14', 'test_14-01.jpg'))
+            # Already converted documents are skipped
+            self.assertTrue(main(['./tests/test_14.pdf', '-o', path]) == 0)
+            self.assertFalse(os.path.exists(os.path.join(path, 'test_14', 'test_14-01.jpg')))
+        print('test_cli_conversion_with_glob_and_resume: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_cli_file_list_and_glob_expansion(self):
+        start_time = time.time()
+        from pdf2image.cli import _expand_inputs
+        with TemporaryDirectory() as path:
+            file_list = os.path.join(path, 'list.txt')
+            with open(file_list, 'w') as f:
+                f.write('./tests/test.pdf\n\n./tests/test_241.pdf\n')
+            pdf_paths = _expand_inputs(['./tests/test_locked_*.pdf', './tests/test.pdf'], file_list)
+        self.assertTrue(pdf_paths == [
+            './tests/test_locked_both.pdf',
+            './tests/test_locked_owner_only.pdf',
+            './tests/test_locked_user_only.pdf',
+            './tests/test.pdf',
+            './tests/test_241.pdf',
+        ])
+        print('test_cli_file_list_and_glob_expansion: {} sec'.format(time.time() - start_time))
+
+    @profile
+    def test_cli_documents_with_the_same_name(self):
+        start_time = time.time()
+        from pdf2image.cli import _document_names, _expand_inputs, main
+        self.assertTrue(_expand_inputs(['./tests/test.pdf', 'tests/test.pdf', './tests/../tests/test.pdf']) == [
+            './tests/test.pdf'
+        ])
+        names = _document_names(['a/x.pdf', 'b/c/x.pdf', 'a/y.pdf', '/abs/a/z.pdf'])
+        self.assertTrue(names == [os.path.join('a', 'x'), os.path.join('b', 'c', 'x'), 'y', 'z'])
+        # Same folder, the names only differ by the extension
+        with TemporaryDirectory() as path:
+            for name in ['x.pdf', 'x.PDF']:
+                shutil.copyfile('./tests/test.pdf', os.path.join(path, name))
+            self.assertTrue(main([os.path.join(path, 'x.*'), '-o', path]) == 1)
+            self.assertFalse(os.path.exists(os.path.join(path, 'x')))
+        print('test_cli_documents_with_the_same_name: {} sec'.format(time.time() - start_time))
+
     ## Test hanging file handles
 
     @profile
@@ -0,0 +1,148 @@
+"""
+    Performance regression tests, every benchmark is compared to its baseline in tests/perf_baselines.json.
+
+    Timings are stored as multiples of a calibration workload (decoding a reference PNG) measured on the
+    same machine, so that the baselines hold on slower or faster machines.
+
+        python tests_perf.py                                  compare to the baselines
+        PDF2IMAGE_PERF_UPDATE=1 python tests_perf.py          record new baselines
+        PDF2IMAGE_PERF_TOLERANCE=2 python tests_perf.py       allowed slowdown factor (default 1.5)
+"""
+
+import json
+import os
+import sys
+import timeit
+import unittest
+import subprocess
+
+from io import BytesIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+
+from pdf2image import convert_from_bytes, convert_from_path
+from pdf2image.parsers import parse_buffer_to_jpeg, parse_buffer_to_png, parse_buffer_to_ppm
+from pdf2image.pdf2image import _split_pages
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'perf_baselines.json')
+
+UPDATE_BASELINES = os.environ.get('PDF2IMAGE_PERF_UPDATE') == '1'
+
+TOLERANCE = float(os.environ.get('PDF2IMAGE_PERF_TOLERANCE', '1.5'))
+
+try:
+    subprocess.call(["pdfinfo", "-h"], stdout=open(os.devnull, 'w'), stderr=open(os.devnull, 'w'))
+    POPPLER_INSTALLED = True
+except OSError:
+    POPPLER_INSTALLED = False
+
+
+def best_time(func, repeat=10):
+    timings = []
+    for _ in range(repeat):
+        start_time = timeit.default_timer()
+        func()
+        timings.append(timeit.default_timer() - start_time)
+    return min(timings)
+
+
+def synthetic_stream(fmt, mode='RGB', size=(850, 1100), count=20):
+    # A gradient compresses like a real page, unlike noise or a blank image
+    page = Image.linear_gradient('L').resize(size).convert(mode)
+    data = b''
+    for _ in range(count):
+        buf = BytesIO()
+        page.save(buf, format=fmt)
+        data += buf.getvalue()
+    return data
+
+
+class PerformanceTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        reference = synthetic_stream('PNG', count=1)
+        cls.calibration = best_time(lambda: Image.open(BytesIO(reference)).load(), repeat=20)
+
+        cls.baselines = {}
+        if os.path.exists(BASELINES_PATH):
+            with open(BASELINES_PATH) as f:
+                cls.baselines = json.load(f)
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINES:
+            with open(BASELINES_PATH, 'w') as f:
+                json.dump(cls.baselines, f, indent=4, sort_keys=True)
+                f.write('\n')
+
+    def check_baseline(self, name, elapsed):
+        ratio = elapsed / self.calibration
+        print('{}: {:.4f} sec ({:.2f}x calibration)'.format(name, elapsed, ratio))
+
+        if UPDATE_BASELINES:
+            self.baselines[name] = round(ratio, 2)
+        elif name in self.baselines:
+            self.assertTrue(
+                ratio <= self.baselines[name] * TOLERANCE,
+                '{} is {:.2f}x slower than its baseline'.format(name, ratio / self.baselines[name])
+            )
+        else:
+            # Reported as a skip, not a pass, so that missing baselines stay visible
+            self.skipTest('{} has no baseline, run with PDF2IMAGE_PERF_UPDATE=1 to record one'.format(name))
+
+    ## Parsers
+
+    def test_parse_ppm_stream(self):
+        data = synthetic_stream('PPM')
+        self.check_baseline('parse_ppm_stream', best_time(lambda: [im.load() for im in parse_buffer_to_ppm(data)]))
+
+    def test_parse_pgm_stream(self):
+        data = synthetic_stream('PPM', mode='L')
+        self.check_baseline('parse_pgm_stream', best_time(lambda: [im.load() for im in parse_buffer_to_ppm(data)]))
+
+    def test_parse_png_stream(self):
+        data = synthetic_stream('PNG')
+        self.check_baseline('parse_png_stream', best_time(lambda: [im.load() for im in parse_buffer_to_png(data)]))
+
+    def test_parse_jpeg_stream(self):
+        data = synthetic_stream('JPEG')
+        self.check_baseline('parse_jpeg_stream', best_time(lambda: [im.load() for im in parse_buffer_to_jpeg(data)]))
+
+    ## Scheduling
+
+    def test_split_pages_by_cost(self):
+        costs = dict((page, (page * 7919) % 100 + 1) for page in range(1, 10001))
+        self.check_baseline('split_pages_by_cost', best_time(lambda: _split_pages(1, 10000, 16, costs)))
+
+    ## End to end
+
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_241(self):
+        self.check_baseline('conversion_from_path_241', best_time(
+            lambda: convert_from_path('./tests/test_241.pdf', dpi=50), repeat=3
+        ))
+
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_241_with_4_threads(self):
+        self.check_baseline('conversion_from_path_241_with_4_threads', best_time(
+            lambda: convert_from_path('./tests/test_241.pdf', dpi=50, thread_count=4), repeat=3
+        ))
+
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_path_241_to_png_with_4_threads(self):
+        self.check_baseline('conversion_from_path_241_to_png_with_4_threads', best_time(
+            lambda: convert_from_path('./tests/test_241.pdf', dpi=50, fmt='png', thread_count=4), repeat=3
+        ))
+
+    @unittest.skipIf(not POPPLER_INSTALLED, "Poppler is not installed!")
+    def test_conversion_from_bytes_241_with_4_threads(self):
+        with open('./tests/test_241.pdf', 'rb') as pdf_file:
+            data = pdf_file.read()
+        self.check_baseline('conversion_from_bytes_241_with_4_threads', best_time(
+            lambda: convert_from_bytes(data, dpi=50, thread_count=4), repeat=3
+        ))
+
+if __name__=='__main__':
+    unittest.main()